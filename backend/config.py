@@ -20,8 +20,83 @@ class Settings(BaseSettings):
     chunk_size: int = 800
     chunk_overlap: int = 100
 
+    # Outbound OpenAI quota per model; rate_limit_shared pools it across processes via Redis
+    chat_rpm_limit: int = 500
+    chat_tpm_limit: int = 30000
+    embedding_rpm_limit: int = 3000
+    embedding_tpm_limit: int = 1000000
+    openai_max_concurrency: int = 16
+    rate_limit_shared: bool = False
+
+    # Circuit breaker: open after this many consecutive failed (or slow) OpenAI calls
+    circuit_failure_threshold: int = 5
+    circuit_slow_call_ms: float = 45000
+    circuit_reset_seconds: float = 30
+
+    # Chat completion response cache (Redis, with an in-process fallback)
+    llm_cache_enabled: bool = True
+    llm_cache_ttl_seconds: int = 7 * 24 * 3600
+    llm_cache_max_entries: int = 20000
+    llm_cache_local_max_entries: int = 1000
+
+    # Cap on prompt context after packing retrieved chunks (tokens); 0 = keep
+    # everything retrieved, minus repeated text
+    context_token_budget: int = 0
+    report_context_token_budget: int = 8000
+
+    # Chunk embedding pipeline
+    embedding_batch_size: int = 256
+    embedding_batch_tokens: int = 100000
+    embedding_concurrency: int = 4
+    ingest_queue_size: int = 64
+
+    # Persistent chunk embedding cache
+    embedding_cache_path: str = "./cache/embeddings.sqlite3"
+    embedding_cache_max_entries: int = 100000
+    query_embeddings_path: str = "./cache/query_embeddings.json"
+
+    # Single-text embedding requests arriving within this window share one API call; 0 = off
+    embedding_coalesce_window_ms: float = 5.0
+    embedding_coalesce_max_batch: int = 64
+
+    # PDF extraction
+    pdf_workers: int = 2
+    pdf_pages_per_task: int = 20
+    slow_page_ms: int = 2000
+
+    # Ingestion worker queue
+    worker_concurrency: int = 2
+    ingest_visibility_timeout: int = 3600
+    ingest_small_file_mb: int = 5
+
+    # Vector store backend: "faiss" keeps indexes on the local faiss_data volume;
+    # "mongo" persists vectors in MongoDB and uses faiss_index_dir as a per-replica cache
+    vector_backend: str = "faiss"
+    vector_sync_interval: float = 30.0
+    vector_part_size: int = 512
+
     # FAISS vector store
     faiss_index_dir: str = "./faiss_data"
+    vector_cache_max_mb: int = 256
+    # FAISS index_factory string, e.g. "Flat", "SQfp16", "SQ8", "PQ64", "IVF64,PQ32"
+    vector_index_factory: str = "Flat"
+    vector_index_min_train_points: int = 1000
+    vector_index_nprobe: int = 16
+    # Two-tier retrieval: index this many leading (Matryoshka) dimensions and
+    # re-rank vector_rerank_factor * top_k candidates at full dimension; 0 = off
+    vector_search_dimension: int = 0
+    vector_rerank_factor: int = 4
+    # Threads running FAISS builds and searches off the event loop
+    vector_store_threads: int = 4
+    # Superseded index snapshots kept for readers still on an older version
+    vector_snapshot_retain: int = 1
+    # How long a cached index is served before its manifest is checked for a newer snapshot
+    vector_manifest_ttl_seconds: float = 1.0
+
+    # Per-company HNSW index for cross-document search
+    company_index_hnsw_m: int = 32
+    company_index_ef_search: int = 64
+    company_index_compact_ratio: float = 0.3
 
     # File upload limits
     max_file_size_mb: int = 50
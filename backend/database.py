@@ -18,6 +18,8 @@ reports_collection = db["generated_reports"]
 audit_collection = db["audit_logs"]
 embeddings_collection = db["embeddings"]
 document_analysis_collection = db["document_analysis"]
+contents_collection = db["document_contents"]
+texts_collection = db["document_texts"]
 
 
 
@@ -27,6 +29,8 @@ async def init_indexes():
     await users_collection.create_index("email", unique=True)
     await documents_collection.create_index("company_id")
     await documents_collection.create_index([("company_id", 1), ("upload_date", -1)])
+    await documents_collection.create_index("content_hash")
+    await embeddings_collection.create_index([("document_id", 1), ("version", 1), ("part", 1)])
     await compliance_collection.create_index("document_id", unique=True)
     await climate_collection.create_index("document_id", unique=True)
     await reports_collection.create_index("document_id")
@@ -0,0 +1,166 @@
+"""
+Analysis planner: runs compliance, climate and document analysis as one DAG.
+
+Each requested output adds its retrieval and LLM steps to a plan. Steps are
+keyed by what they compute, so a step needed by several outputs runs once;
+compliance and climate share one IFRS S2 analysis over the union of their
+climate contexts. All retrieval queries in a plan are resolved with one
+embedding request and index search, and every step starts as soon as its
+dependencies finish, so independent LLM calls (S1 and S2, the document
+sections) run concurrently.
+"""
+
+import time
+import asyncio
+import logging
+from itertools import chain, zip_longest
+from typing import Awaitable, Callable, Hashable
+from services.openai_service import retrieve_relevant_chunks_batch
+from services.vector_store import ChunkHit
+from engines.compliance_engine import S1_QUERY, S2_QUERY, analyze_s1, analyze_s2, save_compliance_analysis
+from engines.risk_engine import CLIMATE_QUERY, save_climate_analysis
+from engines.document_analysis_engine import SECTIONS, analyze_section, complete_document_analysis
+
+logger = logging.getLogger("ifrs.analysis_planner")
+
+COMPLIANCE = "compliance"
+CLIMATE = "climate"
+DOCUMENT_ANALYSIS = "document_analysis"
+
+RETRIEVE = ("retrieve",)
+
+
+def _interleave(*chunk_lists: list[ChunkHit]) -> list[ChunkHit]:
+    """Merge ranked chunk lists round-robin so each query's best chunks come first."""
+    return [chunk for chunk in chain.from_iterable(zip_longest(*chunk_lists)) if chunk is not None]
+
+
+class AnalysisPlan:
+    """A DAG of analysis steps for one document, deduplicated by step key."""
+
+    def __init__(self, document_id: str):
+        self.document_id = document_id
+        # key -> (dependency keys, fn called with the dependencies' results)
+        self._steps: dict[Hashable, tuple[tuple[Hashable, ...], Callable[..., Awaitable]]] = {}
+        self._queries: dict[str, int] = {}
+        self.requested = 0
+
+    def step(self, key: Hashable, deps: list[Hashable], fn: Callable[..., Awaitable]) -> Hashable:
+        """Add a step computing fn(*dependency results), unless one with this key exists."""
+        self.requested += 1
+        if key not in self._steps:
+            # Dependencies must already be planned, which keeps the graph acyclic
+            missing = [dep for dep in deps if dep not in self._steps]
+            if missing:
+                raise KeyError(f"Step {key} depends on unplanned steps {missing}")
+            self._steps[key] = (tuple(deps), fn)
+        return key
+
+    def chunks(self, query: str, top_k: int) -> Hashable:
+        """Step yielding the top_k chunks for query from the plan's batched retrieval."""
+        self._queries[query] = max(top_k, self._queries.get(query, 0))
+        if RETRIEVE not in self._steps:
+            self._steps[RETRIEVE] = ((), self._retrieve)
+
+        async def select(results: dict[str, list[ChunkHit]]) -> list[ChunkHit]:
+            return results[query][:top_k]
+
+        return self.step(("chunks", query, top_k), [RETRIEVE], select)
+
+    async def _retrieve(self) -> dict[str, list[ChunkHit]]:
+        queries = list(self._queries)
+        results = await retrieve_relevant_chunks_batch(
+            self.document_id, queries, [self._queries[query] for query in queries]
+        )
+        return dict(zip(queries, results))
+
+    async def run(self, targets: list[Hashable]) -> list:
+        """Run the steps the targets depend on and return the targets' results."""
+        tasks: dict[Hashable, asyncio.Task] = {}
+
+        def schedule(key: Hashable) -> asyncio.Task:
+            if key not in tasks:
+                deps, fn = self._steps[key]
+                tasks[key] = asyncio.ensure_future(execute(key, deps, fn))
+            return tasks[key]
+
+        async def execute(key: Hashable, deps: tuple[Hashable, ...], fn: Callable[..., Awaitable]):
+            inputs = await asyncio.gather(*(schedule(dep) for dep in deps))
+            start = time.perf_counter()
+            result = await fn(*inputs)
+            logger.debug(f"Step {key} for {self.document_id} took {time.perf_counter() - start:.2f}s")
+            return result
+
+        start = time.perf_counter()
+        try:
+            return await asyncio.gather(*(schedule(key) for key in targets))
+        finally:
+            # One failed step fails the run; don't leave its siblings running
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            logger.info(
+                f"Analysis plan for {self.document_id}: {len(tasks)} steps "
+                f"({self.requested - len(tasks) + 1} deduplicated) in {time.perf_counter() - start:.1f}s"
+            )
+
+
+def _plan_s2(plan: AnalysisPlan) -> Hashable:
+    s2_chunks = plan.chunks(S2_QUERY, 8)
+    climate_chunks = plan.chunks(CLIMATE_QUERY, 10)
+
+    async def analyze(s2: list[ChunkHit], climate: list[ChunkHit]) -> dict:
+        return await analyze_s2(plan.document_id, _interleave(s2, climate))
+
+    return plan.step(("analyze", "s2"), [s2_chunks, climate_chunks], analyze)
+
+
+def _plan_compliance(plan: AnalysisPlan) -> Hashable:
+    async def analyze(chunks: list[ChunkHit]) -> dict:
+        return await analyze_s1(plan.document_id, chunks)
+
+    async def save(s1: dict, s2: dict) -> dict:
+        return await save_compliance_analysis(plan.document_id, s1, s2)
+
+    s1 = plan.step(("analyze", "s1"), [plan.chunks(S1_QUERY, 8)], analyze)
+    return plan.step(("save", COMPLIANCE), [s1, _plan_s2(plan)], save)
+
+
+def _plan_climate(plan: AnalysisPlan) -> Hashable:
+    async def save(s2: dict) -> dict:
+        return await save_climate_analysis(plan.document_id, s2)
+
+    return plan.step(("save", CLIMATE), [_plan_s2(plan)], save)
+
+
+def _plan_document_analysis(plan: AnalysisPlan) -> Hashable:
+    sections = []
+    for name, (query, _, top_k) in SECTIONS.items():
+        async def analyze(chunks: list[ChunkHit], name: str = name) -> dict:
+            return await analyze_section(plan.document_id, name, chunks)
+
+        sections.append(plan.step(("section", name), [plan.chunks(query, top_k)], analyze))
+
+    async def save(*results: dict) -> dict:
+        return await complete_document_analysis(plan.document_id, dict(zip(SECTIONS, results)))
+
+    return plan.step(("save", DOCUMENT_ANALYSIS), sections, save)
+
+
+PLANNERS: dict[str, Callable[[AnalysisPlan], Hashable]] = {
+    COMPLIANCE: _plan_compliance,
+    CLIMATE: _plan_climate,
+    DOCUMENT_ANALYSIS: _plan_document_analysis,
+}
+
+
+async def run_analyses(document_id: str, outputs: list[str]) -> dict[str, dict]:
+    """Run the requested analyses for a document as one plan and persist each result."""
+    unknown = [output for output in outputs if output not in PLANNERS]
+    if unknown:
+        raise ValueError(f"Unknown analysis outputs: {unknown}")
+
+    plan = AnalysisPlan(document_id)
+    targets = [PLANNERS[output](plan) for output in outputs]
+    results = await plan.run(targets)
+    return dict(zip(outputs, results))
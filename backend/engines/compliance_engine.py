@@ -1,25 +1,33 @@
 import json
 from datetime import datetime, timezone
 from database import compliance_collection
-from services.openai_service import retrieve_relevant_chunks, call_openai, S1_SYSTEM_PROMPT, S2_SYSTEM_PROMPT
+from services.openai_service import (
+    retrieve_relevant_chunks,
+    call_openai,
+    S1_SYSTEM_PROMPT,
+    S2_SYSTEM_PROMPT,
+)
+from services.context_packer import pack_context
+from services.vector_store import ChunkHit
 
+S1_QUERY = "governance strategy risk management metrics targets sustainability"
+S2_QUERY = "climate risk physical transition emissions scenario carbon"
 
-async def analyze_s1(document_id: str) -> dict:
+
+async def analyze_s1(document_id: str, chunks: list[ChunkHit] | None = None) -> dict:
     """Run IFRS S1 compliance analysis."""
-    chunks = await retrieve_relevant_chunks(
-        document_id, "governance strategy risk management metrics targets sustainability", top_k=8
-    )
-    context = "\n\n".join(chunks)
+    if chunks is None:
+        chunks = await retrieve_relevant_chunks(document_id, S1_QUERY, top_k=8)
+    context = pack_context(chunks)
     result = await call_openai(S1_SYSTEM_PROMPT, context)
     return json.loads(result)
 
 
-async def analyze_s2(document_id: str) -> dict:
+async def analyze_s2(document_id: str, chunks: list[ChunkHit] | None = None) -> dict:
     """Run IFRS S2 climate-related disclosure analysis."""
-    chunks = await retrieve_relevant_chunks(
-        document_id, "climate risk physical transition emissions scenario carbon", top_k=8
-    )
-    context = "\n\n".join(chunks)
+    if chunks is None:
+        chunks = await retrieve_relevant_chunks(document_id, S2_QUERY, top_k=8)
+    context = pack_context(chunks)
     result = await call_openai(S2_SYSTEM_PROMPT, context)
     return json.loads(result)
 
@@ -59,9 +67,13 @@ def generate_gap_summary(s1_result: dict, s2_result: dict) -> str:
 
 async def run_compliance_analysis(document_id: str) -> dict:
     """Full compliance analysis pipeline."""
-    s1 = await analyze_s1(document_id)
-    s2 = await analyze_s2(document_id)
+    from engines.analysis_planner import COMPLIANCE, run_analyses
+    results = await run_analyses(document_id, [COMPLIANCE])
+    return results[COMPLIANCE]
+
 
+async def save_compliance_analysis(document_id: str, s1: dict, s2: dict) -> dict:
+    """Score the S1 and S2 analyses and persist the compliance result."""
     scores = calculate_scores(s1, s2)
     gap_summary = generate_gap_summary(s1, s2)
 
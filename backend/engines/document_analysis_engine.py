@@ -6,10 +6,12 @@ covering all IFRS S1 and S2 metrics with sub-section breakdowns.
 
 import json
 import logging
-import asyncio
 from datetime import datetime, timezone
 from database import document_analysis_collection
 from services.openai_service import retrieve_relevant_chunks, call_openai
+from services.context_packer import pack_context
+from services.vector_store import ChunkHit
+from services.circuit_breaker import CircuitOpenError
 
 logger = logging.getLogger("ifrs.document_analysis")
 
@@ -265,76 +267,77 @@ Return JSON only:
 }"""
 
 
-async def _analyze_section(document_id: str, query: str, prompt: str, top_k: int = 8) -> dict:
+# Section name -> (retrieval query, prompt, top_k)
+SECTIONS = {
+    "overview": (
+        "sustainability report overview company profile ESG reporting framework scope",
+        DOCUMENT_OVERVIEW_PROMPT,
+        10,
+    ),
+    "governance": (
+        "governance board oversight committee ESG expertise compensation sustainability reporting structure",
+        GOVERNANCE_DETAILED_PROMPT,
+        8,
+    ),
+    "strategy": (
+        "strategy financial materiality climate scenario analysis business model resilience opportunities revenue risk",
+        STRATEGY_DETAILED_PROMPT,
+        8,
+    ),
+    "risk_management": (
+        "risk management identification assessment enterprise risk physical transition flood drought carbon pricing regulatory",
+        RISK_MANAGEMENT_DETAILED_PROMPT,
+        8,
+    ),
+    "metrics_targets": (
+        "metrics targets emissions scope GHG energy renewable net zero reduction SBTi carbon price water waste",
+        METRICS_TARGETS_DETAILED_PROMPT,
+        10,
+    ),
+}
+
+
+async def _analyze_section(
+    document_id: str, query: str, prompt: str, top_k: int = 8, chunks: list[ChunkHit] | None = None
+) -> dict:
     """Run AI analysis on a specific section."""
-    chunks = await retrieve_relevant_chunks(document_id, query, top_k=top_k)
+    if chunks is None:
+        chunks = await retrieve_relevant_chunks(document_id, query, top_k=top_k)
     if not chunks:
         logger.warning(f"No chunks found for document {document_id} with query: {query[:50]}")
         return {}
-    context = "\n\n".join(chunks)
+    context = pack_context(chunks)
     result = await call_openai(prompt, context)
     return json.loads(result)
 
 
+async def analyze_section(document_id: str, name: str, chunks: list[ChunkHit]) -> dict:
+    """Analyze one SECTIONS entry; a failure is recorded in the result instead of raised."""
+    query, prompt, top_k = SECTIONS[name]
+    try:
+        return await _analyze_section(document_id, query, prompt, top_k, chunks)
+    except CircuitOpenError:
+        # Don't save a zero score over the last good analysis; the caller serves it stale
+        raise
+    except Exception as e:
+        logger.error(f"Section {name} analysis failed: {e}")
+        return {"error": str(e), "score": 0}
+
+
 async def run_document_analysis(document_id: str) -> dict:
     """
     Run comprehensive multi-level document analysis.
-    Analyzes all IFRS S1 and S2 sections in parallel where possible,
-    then generates an overall AI assessment.
+    Retrieves context for all IFRS S1 and S2 sections in one batched search,
+    analyzes the sections in parallel, then generates an overall AI assessment.
     """
+    from engines.analysis_planner import DOCUMENT_ANALYSIS, run_analyses
     logger.info(f"Starting comprehensive document analysis for {document_id}")
+    results = await run_analyses(document_id, [DOCUMENT_ANALYSIS])
+    return results[DOCUMENT_ANALYSIS]
 
-    # Phase 1: Run all section analyses in parallel
-    overview_task = _analyze_section(
-        document_id,
-        "sustainability report overview company profile ESG reporting framework scope",
-        DOCUMENT_OVERVIEW_PROMPT,
-        top_k=10,
-    )
-    governance_task = _analyze_section(
-        document_id,
-        "governance board oversight committee ESG expertise compensation sustainability reporting structure",
-        GOVERNANCE_DETAILED_PROMPT,
-        top_k=8,
-    )
-    strategy_task = _analyze_section(
-        document_id,
-        "strategy financial materiality climate scenario analysis business model resilience opportunities revenue risk",
-        STRATEGY_DETAILED_PROMPT,
-        top_k=8,
-    )
-    risk_task = _analyze_section(
-        document_id,
-        "risk management identification assessment enterprise risk physical transition flood drought carbon pricing regulatory",
-        RISK_MANAGEMENT_DETAILED_PROMPT,
-        top_k=8,
-    )
-    metrics_task = _analyze_section(
-        document_id,
-        "metrics targets emissions scope GHG energy renewable net zero reduction SBTi carbon price water waste",
-        METRICS_TARGETS_DETAILED_PROMPT,
-        top_k=10,
-    )
-
-    results = await asyncio.gather(
-        overview_task,
-        governance_task,
-        strategy_task,
-        risk_task,
-        metrics_task,
-        return_exceptions=True,
-    )
-
-    # Handle any failures gracefully
-    section_names = ["overview", "governance", "strategy", "risk_management", "metrics_targets"]
-    sections = {}
-    for name, result in zip(section_names, results):
-        if isinstance(result, Exception):
-            logger.error(f"Section {name} analysis failed: {result}")
-            sections[name] = {"error": str(result), "score": 0}
-        else:
-            sections[name] = result
 
+async def complete_document_analysis(document_id: str, sections: dict[str, dict]) -> dict:
+    """Score the analyzed sections, generate the overall assessment and persist the result."""
     # Phase 2: Calculate aggregate scores
     governance_score = sections.get("governance", {}).get("governance_score", 0)
     strategy_score = sections.get("strategy", {}).get("strategy_score", 0)
@@ -400,6 +403,8 @@ async def run_document_analysis(document_id: str) -> dict:
     try:
         overall_assessment = await call_openai(OVERALL_AI_ASSESSMENT_PROMPT, assessment_context)
         overall_assessment = json.loads(overall_assessment)
+    except CircuitOpenError:
+        raise
     except Exception as e:
         logger.error(f"Overall assessment generation failed: {e}")
         overall_assessment = {
@@ -1,12 +1,17 @@
 import logging
 import time
+import asyncio
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 from config import get_settings
 from database import init_indexes, close_db
-from routes import auth, documents, compliance, climate, reports, dashboard, admin, document_analysis
+from services.file_service import shutdown_pdf_pool
+from services.vector_store import shutdown_vector_store
+from services.query_registry import load_query_registry
+from worker import requeue_stalled_ingests
+from routes import auth, documents, compliance, climate, reports, dashboard, admin, document_analysis, search, analysis_suite
 
 settings = get_settings()
 
@@ -23,7 +28,13 @@ async def lifespan(app: FastAPI):
     logger.info("Starting IFRS Dashboard API v1.0.0")
     await init_indexes()
     logger.info("Database indexes initialized")
+    await requeue_stalled_ingests()
+    # Don't hold up startup on the embeddings API; retrieval embeds per call until this lands
+    registry_load = asyncio.create_task(load_query_registry())
     yield
+    registry_load.cancel()
+    shutdown_pdf_pool()
+    shutdown_vector_store()
     await close_db()
     logger.info("Database connection closed")
 
@@ -71,6 +82,8 @@ app.include_router(reports.router, prefix="/reports", tags=["Reports"])
 app.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboard"])
 app.include_router(admin.router, prefix="/admin", tags=["Admin"])
 app.include_router(document_analysis.router, prefix="/document-analysis", tags=["Document Analysis"])
+app.include_router(search.router, prefix="/search", tags=["Search"])
+app.include_router(analysis_suite.router, prefix="/analysis-suite", tags=["Analysis Suite"])
 
 
 @app.get("/health")
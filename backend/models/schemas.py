@@ -73,6 +73,14 @@ class DocumentResponse(BaseModel):
     upload_date: datetime
 
 
+class ExtractionStats(BaseModel):
+    document_id: str
+    page_count: int
+    duration_ms: float
+    page_timings_ms: List[float]
+    slow_pages: List[int]
+
+
 # --- Compliance ---
 
 class ComplianceResult(BaseModel):
@@ -86,6 +94,7 @@ class ComplianceResult(BaseModel):
     metrics_score: float
     gap_summary: str
     created_at: datetime
+    stale: bool = False
 
 
 # --- Climate Risk ---
@@ -101,6 +110,7 @@ class ClimateRiskResult(BaseModel):
     emissions_scope3: Optional[float] = None
     risk_heatmap_data: dict
     created_at: datetime
+    stale: bool = False
 
 
 # --- Report Generation ---
@@ -116,6 +126,7 @@ class ReportType(str, Enum):
 class ReportGenerateRequest(BaseModel):
     document_id: str
     report_type: ReportType
+    force: bool = False
 
 
 class ReportResponse(BaseModel):
@@ -124,6 +135,7 @@ class ReportResponse(BaseModel):
     report_type: ReportType
     generated_text: str
     created_at: datetime
+    stale: bool = False
 
 
 # --- Document Analysis (Multi-Level) ---
@@ -140,6 +152,26 @@ class DocumentAnalysisResult(BaseModel):
     metrics_targets: dict
     overall_assessment: dict
     created_at: datetime
+    stale: bool = False
+
+
+
+# --- Analysis Suite ---
+
+class AnalysisSuiteResult(BaseModel):
+    document_id: str
+    compliance: ComplianceResult
+    climate: ClimateRiskResult
+    document_analysis: DocumentAnalysisResult
+
+# --- Semantic Search ---
+
+class SemanticSearchHit(BaseModel):
+    document_id: str
+    file_name: Optional[str] = None
+    chunk_index: int
+    score: float
+    text: str
 
 
 # --- Dashboard ---
@@ -5,6 +5,13 @@ from bson import ObjectId
 from database import users_collection, companies_collection, audit_collection
 from models.schemas import UserResponse, CompanyCreate, CompanyResponse
 from utils.auth import get_current_user
+from services.embedding_cache import get_embedding_cache
+from services.vector_store import get_vector_store
+from services.query_registry import get_query_registry
+from services.openai_service import get_embedding_coalescer
+from services.llm_cache import get_llm_cache
+from services.rate_limiter import get_rate_limiter
+from services.circuit_breaker import breaker_stats
 from datetime import datetime, timezone
 
 logger = logging.getLogger("ifrs.admin")
@@ -83,3 +90,38 @@ async def get_audit_logs(
         log["_id"] = str(log["_id"])
         logs.append(log)
     return logs
+
+
+@router.get("/embedding-cache")
+async def get_embedding_cache_stats(user=Depends(admin_only)):
+    return get_embedding_cache().stats()
+
+
+@router.get("/query-embeddings")
+async def get_query_embedding_stats(user=Depends(admin_only)):
+    return get_query_registry().stats()
+
+
+@router.get("/embedding-coalescer")
+async def get_embedding_coalescer_stats(user=Depends(admin_only)):
+    return get_embedding_coalescer().stats()
+
+
+@router.get("/llm-cache")
+async def get_llm_cache_stats(user=Depends(admin_only)):
+    return get_llm_cache().stats()
+
+
+@router.get("/rate-limiter")
+async def get_rate_limiter_stats(user=Depends(admin_only)):
+    return get_rate_limiter().stats()
+
+
+@router.get("/circuit-breakers")
+async def get_circuit_breaker_stats(user=Depends(admin_only)):
+    return breaker_stats()
+
+
+@router.get("/vector-cache")
+async def get_vector_cache_stats(user=Depends(admin_only)):
+    return get_vector_store().cache_stats()
@@ -0,0 +1,49 @@
+import asyncio
+import logging
+from fastapi import APIRouter, Depends, HTTPException
+from bson import ObjectId
+from database import documents_collection
+from models.schemas import AnalysisSuiteResult
+from engines.analysis_planner import COMPLIANCE, CLIMATE, DOCUMENT_ANALYSIS, run_analyses
+from services.llm_cache import bypass_llm_cache
+from services.circuit_breaker import CircuitOpenError
+from utils.auth import get_current_user
+from utils.fallback import serve_stale
+from routes.compliance import get_analysis as get_compliance
+from routes.climate import get_climate
+from routes.document_analysis import get_analysis as get_document_analysis
+
+logger = logging.getLogger("ifrs.analysis_suite")
+router = APIRouter()
+
+
+@router.post("/run/{document_id}", response_model=AnalysisSuiteResult)
+async def run_suite(document_id: str, force: bool = False, user=Depends(get_current_user)):
+    """Run compliance, climate and document analysis in one run, sharing retrieval and LLM steps."""
+    doc = await documents_collection.find_one({"_id": ObjectId(document_id)}, {"status": 1})
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if doc["status"] != "completed":
+        raise HTTPException(status_code=400, detail="Document still processing")
+
+    try:
+        with bypass_llm_cache(force):
+            results = await run_analyses(document_id, [COMPLIANCE, CLIMATE, DOCUMENT_ANALYSIS])
+        logger.info(f"Analysis suite completed for document {document_id}")
+        return {"document_id": document_id, **results}
+    except CircuitOpenError as e:
+        logger.warning(f"Analysis suite for {document_id} skipped: {e}")
+        compliance, climate, document_analysis = await asyncio.gather(
+            serve_stale(get_compliance(document_id, user), e),
+            serve_stale(get_climate(document_id, user), e),
+            serve_stale(get_document_analysis(document_id, user), e),
+        )
+        return {
+            "document_id": document_id,
+            COMPLIANCE: compliance,
+            CLIMATE: climate,
+            DOCUMENT_ANALYSIS: document_analysis,
+        }
+    except Exception as e:
+        logger.error(f"Analysis suite failed for {document_id}: {e}")
+        raise HTTPException(status_code=500, detail="Analysis failed. Please try again.")
@@ -4,24 +4,31 @@ from bson import ObjectId
 from database import climate_collection, documents_collection
 from models.schemas import ClimateRiskResult
 from engines.risk_engine import run_climate_analysis
+from services.llm_cache import bypass_llm_cache
+from services.circuit_breaker import CircuitOpenError
 from utils.auth import get_current_user
+from utils.fallback import serve_stale, results_stale
 
 logger = logging.getLogger("ifrs.climate")
 router = APIRouter()
 
 
 @router.post("/analyze/{document_id}", response_model=ClimateRiskResult)
-async def analyze_climate(document_id: str, user=Depends(get_current_user)):
-    doc = await documents_collection.find_one({"_id": ObjectId(document_id)})
+async def analyze_climate(document_id: str, force: bool = False, user=Depends(get_current_user)):
+    doc = await documents_collection.find_one({"_id": ObjectId(document_id)}, {"status": 1})
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
     if doc["status"] != "completed":
         raise HTTPException(status_code=400, detail="Document still processing")
 
     try:
-        result = await run_climate_analysis(document_id)
+        with bypass_llm_cache(force):
+            result = await run_climate_analysis(document_id)
         logger.info(f"Climate analysis completed for document {document_id}")
         return result
+    except CircuitOpenError as e:
+        logger.warning(f"Climate analysis for {document_id} skipped: {e}")
+        return await serve_stale(get_climate(document_id, user), e)
     except Exception as e:
         logger.error(f"Climate analysis failed for {document_id}: {e}")
         raise HTTPException(status_code=500, detail="Climate analysis failed. Please try again.")
@@ -44,6 +51,7 @@ async def get_climate(document_id: str, user=Depends(get_current_user)):
         emissions_scope3=analysis.get("emissions_scope3"),
         risk_heatmap_data=analysis["risk_heatmap_data"],
         created_at=analysis["created_at"],
+        stale=results_stale(),
     )
 
 
@@ -4,24 +4,31 @@ from bson import ObjectId
 from database import compliance_collection, documents_collection
 from models.schemas import ComplianceResult
 from engines.compliance_engine import run_compliance_analysis
+from services.llm_cache import bypass_llm_cache
+from services.circuit_breaker import CircuitOpenError
 from utils.auth import get_current_user
+from utils.fallback import serve_stale, results_stale
 
 logger = logging.getLogger("ifrs.compliance")
 router = APIRouter()
 
 
 @router.post("/run/{document_id}", response_model=ComplianceResult)
-async def run_analysis(document_id: str, user=Depends(get_current_user)):
-    doc = await documents_collection.find_one({"_id": ObjectId(document_id)})
+async def run_analysis(document_id: str, force: bool = False, user=Depends(get_current_user)):
+    doc = await documents_collection.find_one({"_id": ObjectId(document_id)}, {"status": 1})
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
     if doc["status"] != "completed":
         raise HTTPException(status_code=400, detail="Document still processing")
 
     try:
-        result = await run_compliance_analysis(document_id)
+        with bypass_llm_cache(force):
+            result = await run_compliance_analysis(document_id)
         logger.info(f"Compliance analysis completed for document {document_id}")
         return result
+    except CircuitOpenError as e:
+        logger.warning(f"Compliance analysis for {document_id} skipped: {e}")
+        return await serve_stale(get_analysis(document_id, user), e)
     except Exception as e:
         logger.error(f"Compliance analysis failed for {document_id}: {e}")
         raise HTTPException(status_code=500, detail="Analysis failed. Please try again.")
@@ -44,4 +51,5 @@ async def get_analysis(document_id: str, user=Depends(get_current_user)):
         metrics_score=analysis["metrics_score"],
         gap_summary=analysis["gap_summary"],
         created_at=analysis["created_at"],
+        stale=results_stale(),
     )
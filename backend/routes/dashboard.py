@@ -62,7 +62,7 @@ async def get_dashboard_summary(company_id: str, user=Depends(get_current_user))
     # Get latest emissions
     emissions = {"scope1": 0, "scope2": 0, "scope3": 0}
     latest_doc = await documents_collection.find_one(
-        {"company_id": company_id}, sort=[("upload_date", -1)]
+        {"company_id": company_id}, {"_id": 1}, sort=[("upload_date", -1)]
     )
     if latest_doc:
         latest_risk = await climate_collection.find_one(
@@ -4,25 +4,32 @@ from bson import ObjectId
 from database import document_analysis_collection, documents_collection
 from models.schemas import DocumentAnalysisResult
 from engines.document_analysis_engine import run_document_analysis
+from services.llm_cache import bypass_llm_cache
+from services.circuit_breaker import CircuitOpenError
 from utils.auth import get_current_user
+from utils.fallback import serve_stale, results_stale
 
 logger = logging.getLogger("ifrs.document_analysis")
 router = APIRouter()
 
 
 @router.post("/run/{document_id}", response_model=DocumentAnalysisResult)
-async def run_analysis(document_id: str, user=Depends(get_current_user)):
+async def run_analysis(document_id: str, force: bool = False, user=Depends(get_current_user)):
     """Run comprehensive multi-level document analysis with AI insights."""
-    doc = await documents_collection.find_one({"_id": ObjectId(document_id)})
+    doc = await documents_collection.find_one({"_id": ObjectId(document_id)}, {"status": 1})
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
     if doc["status"] != "completed":
         raise HTTPException(status_code=400, detail="Document still processing")
 
     try:
-        result = await run_document_analysis(document_id)
+        with bypass_llm_cache(force):
+            result = await run_document_analysis(document_id)
         logger.info(f"Document analysis completed for {document_id}")
         return result
+    except CircuitOpenError as e:
+        logger.warning(f"Document analysis for {document_id} skipped: {e}")
+        return await serve_stale(get_analysis(document_id, user), e)
     except Exception as e:
         logger.error(f"Document analysis failed for {document_id}: {e}")
         raise HTTPException(
@@ -52,4 +59,5 @@ async def get_analysis(document_id: str, user=Depends(get_current_user)):
         metrics_targets=analysis["metrics_targets"],
         overall_assessment=analysis["overall_assessment"],
         created_at=analysis["created_at"],
+        stale=results_stale(),
     )
@@ -1,64 +1,136 @@
 import os
+import asyncio
 import logging
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, BackgroundTasks, Query
+from fastapi import APIRouter, Request, Depends, HTTPException, Query
 from datetime import datetime, timezone
 from bson import ObjectId
 from typing import List
-from database import documents_collection
-from models.schemas import DocumentResponse
+from database import documents_collection, contents_collection
+from models.schemas import DocumentResponse, ExtractionStats
 from utils.auth import get_current_user
-from services.file_service import process_document
-from services.vector_store import get_vector_store
+from services.file_service import receive_upload, UploadTooLargeError, InvalidUploadError
+from services.vector_store import get_async_vector_store
+from services.content_store import acquire_content, release_content
+from services.text_store import load_text, delete_text
+from services.company_index import get_company_index
+from worker import enqueue_ingest
 from config import get_settings
 
 logger = logging.getLogger("ifrs.documents")
 settings = get_settings()
 router = APIRouter()
 
+# Fields needed to build a DocumentResponse
+METADATA_PROJECTION = {
+    "company_id": 1,
+    "uploaded_by": 1,
+    "file_name": 1,
+    "file_url": 1,
+    "status": 1,
+    "upload_date": 1,
+}
 
-@router.post("/upload", response_model=DocumentResponse)
+
+# The body is parsed by receive_upload, so describe the form for the API docs
+UPLOAD_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        "multipart/form-data": {
+            "schema": {
+                "type": "object",
+                "properties": {"file": {"type": "string", "format": "binary"}},
+                "required": ["file"],
+            }
+        }
+    },
+}
+
+
+@router.post("/upload", response_model=DocumentResponse, openapi_extra={"requestBody": UPLOAD_REQUEST_BODY})
 async def upload_document(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(...),
+    request: Request,
     user=Depends(get_current_user),
 ):
-    if not file.filename.lower().endswith(".pdf"):
-        raise HTTPException(status_code=400, detail="Only PDF files are supported")
-
-    # Read and validate file size
-    content = await file.read()
+    # Stream the multipart body straight to disk, enforcing the size limit and
+    # hashing as bytes arrive
+    os.makedirs(settings.upload_dir, exist_ok=True)
     max_bytes = settings.max_file_size_mb * 1024 * 1024
-    if len(content) > max_bytes:
+    try:
+        file_name, file_path, file_size, content_hash = await receive_upload(
+            request, "file", settings.upload_dir, max_bytes
+        )
+    except UploadTooLargeError:
         raise HTTPException(
             status_code=400,
             detail=f"File size exceeds {settings.max_file_size_mb}MB limit",
         )
+    except InvalidUploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    if len(content) == 0:
+    if file_size == 0:
+        os.remove(file_path)
         raise HTTPException(status_code=400, detail="File is empty")
 
-    # Save file with sanitized name
-    os.makedirs(settings.upload_dir, exist_ok=True)
-    safe_name = "".join(c for c in file.filename if c.isalnum() or c in "._- ")
-    file_path = os.path.join(settings.upload_dir, f"{ObjectId()}_{safe_name}")
-    with open(file_path, "wb") as f:
-        f.write(content)
+    # Byte-identical uploads share extracted text and vector index
+    content = await acquire_content(content_hash, file_path, file_size)
+    is_duplicate = content["file_url"] != file_path
+    if is_duplicate:
+        os.remove(file_path)
+        file_path = content["file_url"]
+
+    needs_processing = not is_duplicate
+    if content["status"] == "failed":
+        # Retry a previously failed ingest; only one uploader wins the reset
+        reset = await contents_collection.update_one(
+            {"_id": content_hash, "status": "failed"},
+            {"$set": {"status": "processing"}, "$unset": {"error": ""}},
+        )
+        needs_processing = reset.modified_count == 1
+    status = "completed" if content["status"] == "completed" else "processing"
 
     doc = {
         "company_id": user["company_id"],
         "uploaded_by": str(user["_id"]),
-        "file_name": file.filename,
+        "file_name": file_name,
         "file_url": file_path,
-        "file_size": len(content),
-        "extracted_text": "",
-        "status": "processing",
+        "file_size": file_size,
+        "content_hash": content_hash,
+        "index_id": content_hash,
+        "status": status,
         "upload_date": datetime.now(timezone.utc),
     }
     result = await documents_collection.insert_one(doc)
     doc_id = str(result.inserted_id)
 
-    background_tasks.add_task(process_document, doc_id, file_path)
-    logger.info(f"Document {doc_id} uploaded by {user['email']}, processing started")
+    if status == "processing":
+        # The ingest may have finished between reading the content status and the
+        # insert, in which case its update_many missed this document
+        current = await contents_collection.find_one({"_id": content_hash}, {"status": 1, "error": 1})
+        if current and current["status"] != "processing":
+            fix = {"status": current["status"]}
+            if current["status"] == "failed":
+                fix["error"] = current.get("error")
+            fixed = await documents_collection.update_one(
+                {"_id": result.inserted_id, "status": "processing"}, {"$set": fix}
+            )
+            if fixed.modified_count:
+                status = doc["status"] = current["status"]
+
+    if needs_processing:
+        try:
+            await enqueue_ingest(content_hash, file_path, file_size)
+        except Exception as e:
+            logger.error(f"Could not queue ingestion of content {content_hash}: {e}")
+            await _rollback_upload(result.inserted_id, content_hash)
+            raise HTTPException(
+                status_code=503,
+                detail="Document processing is temporarily unavailable. Please try again shortly.",
+            )
+        logger.info(f"Document {doc_id} uploaded by {user['email']}, processing queued")
+    else:
+        if status == "completed":
+            await asyncio.to_thread(get_company_index().add_document, doc["company_id"], doc_id, content_hash)
+        logger.info(f"Document {doc_id} uploaded by {user['email']}, reusing content {content_hash}")
 
     return DocumentResponse(
         id=doc_id,
@@ -71,6 +143,23 @@ async def upload_document(
     )
 
 
+async def _rollback_upload(document_id: ObjectId, content_hash: str):
+    """Undo an upload whose ingestion could not be queued."""
+    await documents_collection.delete_one({"_id": document_id})
+    # Nothing will process the content now; fail it (and any duplicate uploads
+    # waiting on it) so the next upload of the same file retries the ingest
+    error = "Ingestion could not be queued"
+    await contents_collection.update_one(
+        {"_id": content_hash, "status": "processing"},
+        {"$set": {"status": "failed", "error": error}},
+    )
+    await documents_collection.update_many(
+        {"content_hash": content_hash, "status": "processing"},
+        {"$set": {"status": "failed", "error": error}},
+    )
+    await release_content(content_hash)
+
+
 @router.get("/company/{company_id}", response_model=List[DocumentResponse])
 async def get_company_documents(
     company_id: str,
@@ -80,7 +169,7 @@ async def get_company_documents(
 ):
     docs = []
     cursor = (
-        documents_collection.find({"company_id": company_id})
+        documents_collection.find({"company_id": company_id}, METADATA_PROJECTION)
         .sort("upload_date", -1)
         .skip(skip)
         .limit(limit)
@@ -100,15 +189,58 @@ async def get_company_documents(
     return docs
 
 
+@router.get("/{document_id}/extraction", response_model=ExtractionStats)
+async def get_extraction_stats(document_id: str, user=Depends(get_current_user)):
+    doc = await documents_collection.find_one(
+        {"_id": ObjectId(document_id)}, {"content_hash": 1}
+    )
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    content = None
+    if doc.get("content_hash"):
+        content = await contents_collection.find_one(
+            {"_id": doc["content_hash"]}, {"extraction_stats": 1}
+        )
+    if not content or not content.get("extraction_stats"):
+        raise HTTPException(status_code=404, detail="Extraction stats not available")
+
+    return ExtractionStats(document_id=document_id, **content["extraction_stats"])
+
+
+@router.get("/{document_id}/text")
+async def get_document_text(document_id: str, user=Depends(get_current_user)):
+    doc = await documents_collection.find_one(
+        {"_id": ObjectId(document_id)}, {"content_hash": 1, "status": 1}
+    )
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if doc["status"] != "completed":
+        raise HTTPException(status_code=400, detail="Document still processing")
+
+    text = await load_text(doc.get("content_hash") or document_id)
+    if text is None:
+        raise HTTPException(status_code=404, detail="Extracted text not available")
+    return {"document_id": document_id, "text": text}
+
+
 @router.delete("/{document_id}")
 async def delete_document(document_id: str, user=Depends(get_current_user)):
-    result = await documents_collection.delete_one({"_id": ObjectId(document_id)})
-    if result.deleted_count == 0:
+    doc = await documents_collection.find_one_and_delete(
+        {"_id": ObjectId(document_id)}, {"content_hash": 1, "company_id": 1}
+    )
+    if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    # Clean up FAISS index for this document
-    store = get_vector_store()
-    store.delete_document(document_id)
+    await asyncio.to_thread(get_company_index().remove_document, doc["company_id"], document_id)
+
+    if doc.get("content_hash"):
+        # Shared artifacts are removed with the last reference
+        await release_content(doc["content_hash"])
+    else:
+        store = get_async_vector_store()
+        await store.delete_document(document_id)
+        await delete_text(document_id)
 
     logger.info(f"Document {document_id} deleted by {user['email']}")
     return {"message": "Document deleted"}
@@ -1,24 +1,92 @@
+import json
+import logging
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from typing import List
 from bson import ObjectId
 from database import reports_collection, documents_collection
 from models.schemas import ReportGenerateRequest, ReportResponse
-from services.openai_service import generate_report
+from services.openai_service import generate_report, stream_report
+from services.llm_cache import bypass_llm_cache
+from services.circuit_breaker import CircuitOpenError
 from utils.auth import get_current_user
+from utils.fallback import serve_stale, results_stale
 
+logger = logging.getLogger("ifrs.reports")
 router = APIRouter()
 
 
 @router.post("/generate", response_model=ReportResponse)
 async def generate(request: ReportGenerateRequest, user=Depends(get_current_user)):
-    doc = await documents_collection.find_one({"_id": ObjectId(request.document_id)})
+    doc = await documents_collection.find_one({"_id": ObjectId(request.document_id)}, {"_id": 1})
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    result = await generate_report(request.document_id, request.report_type.value)
+    try:
+        with bypass_llm_cache(request.force):
+            result = await generate_report(request.document_id, request.report_type.value)
+    except CircuitOpenError as e:
+        return await serve_stale(_latest_report(request.document_id, request.report_type.value), e)
     return result
 
 
+@router.post("/generate/stream")
+async def generate_stream(request: ReportGenerateRequest, user=Depends(get_current_user)):
+    """Generate a report as server-sent events.
+
+    Emits "start" at once, "delta" events with {"text"} as tokens arrive, then
+    "done" with the persisted report, or "error". Disconnecting cancels the
+    upstream generation and nothing is saved.
+    """
+    doc = await documents_collection.find_one({"_id": ObjectId(request.document_id)}, {"_id": 1})
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    async def events():
+        yield _sse("start", {"document_id": request.document_id, "report_type": request.report_type.value})
+        try:
+            with bypass_llm_cache(request.force):
+                async for event, payload in stream_report(request.document_id, request.report_type.value):
+                    if event == "delta":
+                        yield _sse("delta", {"text": payload})
+                    else:
+                        yield _sse("done", ReportResponse(**payload).model_dump(mode="json"))
+        except CircuitOpenError as e:
+            try:
+                report = await serve_stale(_latest_report(request.document_id, request.report_type.value), e)
+                yield _sse("done", report.model_dump(mode="json"))
+            except HTTPException as unavailable:
+                yield _sse("error", {"detail": unavailable.detail})
+        except Exception as e:
+            logger.error(f"Streaming report generation failed for {request.document_id}: {e}")
+            yield _sse("error", {"detail": "Report generation failed. Please try again."})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _latest_report(document_id: str, report_type: str) -> ReportResponse:
+    r = await reports_collection.find_one(
+        {"document_id": document_id, "report_type": report_type}, sort=[("created_at", -1)]
+    )
+    if not r:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return ReportResponse(
+        id=str(r["_id"]),
+        document_id=r["document_id"],
+        report_type=r["report_type"],
+        generated_text=r["generated_text"],
+        created_at=r["created_at"],
+    )
+
+
 @router.get("/{document_id}", response_model=List[ReportResponse])
 async def get_reports(document_id: str, user=Depends(get_current_user)):
     reports = []
@@ -31,6 +99,7 @@ async def get_reports(document_id: str, user=Depends(get_current_user)):
                 report_type=r["report_type"],
                 generated_text=r["generated_text"],
                 created_at=r["created_at"],
+                stale=results_stale(),
             )
         )
     return reports
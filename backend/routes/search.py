@@ -0,0 +1,36 @@
+import asyncio
+import logging
+from fastapi import APIRouter, Depends, Query
+from typing import List
+from bson import ObjectId
+from database import documents_collection
+from models.schemas import SemanticSearchHit
+from services.openai_service import get_embedding
+from services.company_index import get_company_index
+from utils.auth import get_current_user
+
+logger = logging.getLogger("ifrs.search")
+router = APIRouter()
+
+
+@router.get("/company/{company_id}", response_model=List[SemanticSearchHit])
+async def search_company(
+    company_id: str,
+    q: str = Query(..., min_length=1),
+    top_k: int = Query(10, ge=1, le=50),
+    user=Depends(get_current_user),
+):
+    """Semantic search across every completed document of a company."""
+    query_embedding = await get_embedding(q)
+    hits = await asyncio.to_thread(get_company_index().search, company_id, query_embedding, top_k)
+
+    doc_ids = list({ObjectId(hit["document_id"]) for hit in hits})
+    file_names = {}
+    if doc_ids:
+        async for doc in documents_collection.find({"_id": {"$in": doc_ids}}, {"file_name": 1}):
+            file_names[str(doc["_id"])] = doc["file_name"]
+
+    return [
+        SemanticSearchHit(file_name=file_names.get(hit["document_id"]), **hit)
+        for hit in hits
+    ]
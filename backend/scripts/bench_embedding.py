@@ -0,0 +1,85 @@
+"""
+Benchmark chunk embedding throughput against a stubbed embeddings endpoint.
+
+Compares the old one-request-per-chunk path with the batched, concurrency-bounded
+path used by embed_and_store, then re-runs it against a warm embedding cache.
+No network calls are made.
+
+Usage (from backend/):
+    python -m scripts.bench_embedding --chunks 600 --latency-ms 120
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+from types import SimpleNamespace
+
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("JWT_SECRET", "bench")
+# Start from an empty embedding cache so the batched run measures API throughput
+os.environ.setdefault("EMBEDDING_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "embeddings.sqlite3"))
+# The serial baseline is one request per chunk, not coalesced batches
+os.environ.setdefault("EMBEDDING_COALESCE_WINDOW_MS", "0")
+
+from config import get_settings  # noqa: E402
+from services import openai_service  # noqa: E402
+from services.embedding_service import embed_chunks  # noqa: E402
+
+settings = get_settings()
+
+
+def install_stub(latency_s: float, per_input_s: float):
+    """Replace the OpenAI embeddings endpoint with a fixed-latency stub."""
+    stats = {"requests": 0}
+
+    async def create(model: str, input, **kwargs):
+        inputs = [input] if isinstance(input, str) else input
+        stats["requests"] += 1
+        await asyncio.sleep(latency_s + per_input_s * len(inputs))
+        return SimpleNamespace(usage=None, data=[
+            SimpleNamespace(index=i, embedding=[0.0] * settings.embedding_dimension)
+            for i in range(len(inputs))
+        ])
+
+    openai_service.client.embeddings.create = create
+    return stats
+
+
+async def run(n_chunks: int, latency_s: float, per_input_s: float):
+    chunks = [f"Sustainability disclosure chunk {i}. " * 60 for i in range(n_chunks)]
+
+    stats = install_stub(latency_s, per_input_s)
+    start = time.perf_counter()
+    for chunk in chunks:
+        await openai_service.get_embedding(chunk)
+    serial = time.perf_counter() - start
+    serial_requests = stats["requests"]
+
+    stats = install_stub(latency_s, per_input_s)
+    start = time.perf_counter()
+    await embed_chunks(chunks)
+    batched = time.perf_counter() - start
+    batched_requests = stats["requests"]
+
+    stats = install_stub(latency_s, per_input_s)
+    start = time.perf_counter()
+    await embed_chunks(chunks)
+    cached = time.perf_counter() - start
+
+    print(f"chunks={n_chunks} latency={latency_s * 1000:.0f}ms "
+          f"batch_size={settings.embedding_batch_size} concurrency={settings.embedding_concurrency}")
+    print(f"serial : {n_chunks / serial:10.1f} chunks/sec ({serial_requests} requests, {serial:.2f}s)")
+    print(f"batched: {n_chunks / batched:10.1f} chunks/sec ({batched_requests} requests, {batched:.2f}s)")
+    print(f"cached : {n_chunks / cached:10.1f} chunks/sec ({stats['requests']} requests, {cached:.2f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--per-input-ms", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(run(args.chunks, args.latency_ms / 1000, args.per_input_ms / 1000))
@@ -0,0 +1,67 @@
+"""
+Compare FAISS index types on memory, recall@k and search latency.
+
+Uses synthetic clustered unit vectors shaped like document chunk embeddings;
+recall is measured against exact Flat inner-product search.
+
+Usage (from backend/):
+    python -m scripts.bench_index_types --chunks 2000 --factories Flat SQfp16 SQ8 PQ96 IVF32,PQ96
+"""
+
+import time
+import argparse
+import numpy as np
+import faiss
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int = 50, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype("float32")
+    labels = rng.integers(0, clusters, n)
+    vectors = centers[labels] + 0.5 * rng.standard_normal((n, dim)).astype("float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def build(factory: str, vectors: np.ndarray) -> faiss.Index:
+    index = faiss.index_factory(vectors.shape[1], factory, faiss.METRIC_INNER_PRODUCT)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = 16
+    return index
+
+
+def main(n_chunks: int, dim: int, n_queries: int, k: int, factories: list[str]):
+    vectors = synthetic_vectors(n_chunks, dim)
+    queries = synthetic_vectors(n_queries, dim, seed=1)
+
+    exact = build("Flat", vectors)
+    _, truth = exact.search(queries, k)
+
+    print(f"chunks={n_chunks} dim={dim} queries={n_queries} k={k}")
+    print(f"{'index':<16}{'bytes/vec':>10}{'vs Flat':>9}{'recall@k':>10}{'ms/query':>10}")
+    flat_bytes = faiss.serialize_index(exact).nbytes / n_chunks
+    for factory in factories:
+        index = build(factory, vectors)
+        per_vector = faiss.serialize_index(index).nbytes / n_chunks
+
+        start = time.perf_counter()
+        _, found = index.search(queries, k)
+        latency = (time.perf_counter() - start) * 1000 / n_queries
+
+        recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+        print(f"{factory:<16}{per_vector:>10.0f}{flat_bytes / per_vector:>8.1f}x{recall:>10.3f}{latency:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare FAISS index types")
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--factories", nargs="+", default=["Flat", "SQfp16", "SQ8", "PQ96", "IVF32,PQ96"])
+    args = parser.parse_args()
+    main(args.chunks, args.dim, args.queries, args.k, args.factories)
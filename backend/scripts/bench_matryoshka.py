@@ -0,0 +1,102 @@
+"""
+Measure two-tier (Matryoshka) retrieval against exact full-dimension search.
+
+For each short dimension, reports index bytes per vector, recall@k of the
+short index alone, and recall@k after re-ranking rerank_factor * k candidates
+with float16 full vectors. Vectors are taken from the full-dimension document
+indexes in --index-dir when given, otherwise synthetic vectors whose variance
+decays across dimensions (as with text-embedding-3 models) are used.
+
+Usage (from backend/):
+    python -m scripts.bench_matryoshka --dims 256 512 --rerank-factor 4
+    python -m scripts.bench_matryoshka --index-dir ./faiss_data
+"""
+
+import time
+import argparse
+import numpy as np
+import faiss
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int = 50, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    scale = (1.0 / np.sqrt(1 + np.arange(dim) / 64)).astype("float32")
+    centers = rng.standard_normal((clusters, dim)).astype("float32") * scale
+    labels = rng.integers(0, clusters, n)
+    vectors = centers[labels] + 0.5 * scale * rng.standard_normal((n, dim)).astype("float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def load_vectors(index_dir: str, dim: int) -> np.ndarray:
+    from services.vector_store import FAISSVectorStore
+    store = FAISSVectorStore(index_dir, dim)
+    vectors = []
+    for document_id in store.list_documents():
+        stored = store.get_vectors(document_id)
+        if stored is not None and stored.shape[1] == dim:
+            vectors.append(stored)
+    return np.ascontiguousarray(np.vstack(vectors), dtype="float32")
+
+
+def truncate(vectors: np.ndarray, dim: int) -> np.ndarray:
+    reduced = np.ascontiguousarray(vectors[:, :dim])
+    faiss.normalize_L2(reduced)
+    return reduced
+
+
+def recall(found: np.ndarray, truth: np.ndarray, k: int) -> float:
+    return float(np.mean([len(set(f[:k]) & set(t)) / k for f, t in zip(found, truth)]))
+
+
+def main(vectors: np.ndarray, n_queries: int, k: int, dims: list[int], rerank_factor: int):
+    n, full_dim = vectors.shape
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(n, n_queries, replace=False)] + 0.05 * rng.standard_normal(
+        (n_queries, full_dim)
+    ).astype("float32")
+    faiss.normalize_L2(queries)
+
+    exact = faiss.IndexFlatIP(full_dim)
+    exact.add(vectors)
+    start = time.perf_counter()
+    _, truth = exact.search(queries, k)
+    full_ms = (time.perf_counter() - start) * 1000 / n_queries
+    full16 = vectors.astype("float16")
+
+    print(f"vectors={n} full_dim={full_dim} queries={n_queries} k={k} rerank_factor={rerank_factor}")
+    print(f"{'dim':>6}{'bytes/vec':>10}{'recall':>9}{'+rerank':>9}{'ms/query':>10}")
+    print(f"{full_dim:>6}{full_dim * 4:>10}{1.0:>9.3f}{'-':>9}{full_ms:>10.3f}")
+    for dim in dims:
+        index = faiss.IndexFlatIP(dim)
+        index.add(truncate(vectors, dim))
+        short_queries = truncate(queries, dim)
+
+        start = time.perf_counter()
+        _, short = index.search(short_queries, k)
+        _, candidates = index.search(short_queries, min(k * rerank_factor, n))
+        reranked = []
+        for query, row in zip(queries, candidates):
+            scores = full16[row].astype("float32") @ query
+            reranked.append(row[np.argsort(-scores)])
+        latency = (time.perf_counter() - start) * 1000 / n_queries
+
+        print(f"{dim:>6}{dim * 4:>10}{recall(short, truth, k):>9.3f}{recall(reranked, truth, k):>9.3f}{latency:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Matryoshka two-tier retrieval")
+    parser.add_argument("--index-dir", default=None, help="Read vectors from full-dimension document indexes")
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=8)
+    parser.add_argument("--dims", type=int, nargs="+", default=[128, 256, 512])
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.index_dir:
+        data = load_vectors(args.index_dir, args.dim)
+    else:
+        data = synthetic_vectors(args.chunks, args.dim)
+    main(data, min(args.queries, len(data)), args.k, args.dims, args.rerank_factor)
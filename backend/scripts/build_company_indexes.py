@@ -0,0 +1,37 @@
+"""
+Backfill company-level search indexes from existing completed documents.
+
+Documents already present in their company shard are skipped, so the script
+can be re-run safely.
+
+Usage (from backend/):
+    python -m scripts.build_company_indexes [--company COMPANY_ID]
+"""
+
+import asyncio
+import argparse
+from database import documents_collection, close_db
+from services.company_index import get_company_index
+
+
+async def main(company_id: str | None):
+    store = get_company_index()
+    query = {"status": "completed"}
+    if company_id:
+        query["company_id"] = company_id
+
+    count = 0
+    async for doc in documents_collection.find(query, {"company_id": 1, "index_id": 1}):
+        document_id = str(doc["_id"])
+        index_id = doc.get("index_id") or document_id
+        await asyncio.to_thread(store.add_document, doc["company_id"], document_id, index_id)
+        count += 1
+    print(f"Indexed {count} documents")
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build company-level search indexes")
+    parser.add_argument("--company", default=None, help="Only rebuild this company's shard")
+    args = parser.parse_args()
+    asyncio.run(main(args.company))
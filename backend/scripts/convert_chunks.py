@@ -0,0 +1,46 @@
+"""
+Convert legacy ``{id}.chunks.json`` files in the FAISS directory to the binary,
+memory-mappable ``{id}.chunks.bin`` format.
+
+Usage (from backend/):
+    python -m scripts.convert_chunks [--dir ./faiss_data] [--keep-json]
+"""
+
+import os
+import json
+import glob
+import argparse
+from services.chunk_store import MappedChunks, write_chunks
+
+
+def convert(index_dir: str, keep_json: bool = False) -> int:
+    converted = 0
+    for json_path in sorted(glob.glob(os.path.join(index_dir, "*.chunks.json"))):
+        bin_path = json_path[: -len(".json")] + ".bin"
+        with open(json_path, "r") as f:
+            texts = json.load(f)
+
+        write_chunks(bin_path, texts)
+        if list(MappedChunks(bin_path)) != texts:
+            raise RuntimeError(f"Round-trip check failed for {json_path}")
+
+        if not keep_json:
+            os.remove(json_path)
+        converted += 1
+        print(f"{json_path} -> {bin_path} ({len(texts)} chunks)")
+    return converted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert chunk JSON files to the binary chunk store")
+    parser.add_argument("--dir", default=None, help="FAISS index directory (defaults to faiss_index_dir)")
+    parser.add_argument("--keep-json", action="store_true", help="Keep the original JSON files")
+    args = parser.parse_args()
+
+    index_dir = args.dir
+    if index_dir is None:
+        from config import get_settings
+        index_dir = get_settings().faiss_index_dir
+
+    count = convert(index_dir, args.keep_json)
+    print(f"Converted {count} chunk files")
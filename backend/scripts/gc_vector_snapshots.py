@@ -0,0 +1,17 @@
+"""
+Delete superseded per-document index snapshots, files left by crashed writers
+and the write-lock files of deleted documents.
+
+Writers already collect old versions when they publish; this sweep catches
+anything they missed. Safe to run while the API and workers are live.
+
+Usage (from backend/):
+    python -m scripts.gc_vector_snapshots
+"""
+
+from services.vector_store import get_vector_store
+
+
+if __name__ == "__main__":
+    checked = get_vector_store().collect_garbage()
+    print(f"Checked {checked} documents")
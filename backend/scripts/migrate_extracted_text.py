@@ -0,0 +1,52 @@
+"""
+Move inline extracted_text out of documents / document_contents records into
+the compressed document_texts collection.
+
+Idempotent: records are only unset after their text has been written, and
+already-migrated records no longer match.
+
+Usage (from backend/):
+    python -m scripts.migrate_extracted_text [--dry-run]
+"""
+
+import asyncio
+import argparse
+import logging
+from database import documents_collection, contents_collection, close_db
+from services.text_store import save_text
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+logger = logging.getLogger("ifrs.migrate_text")
+
+
+async def migrate_collection(collection, key_for, dry_run: bool) -> int:
+    moved = 0
+    async for record in collection.find(
+        {"extracted_text": {"$exists": True}}, {"extracted_text": 1, "content_hash": 1}
+    ):
+        text = record.get("extracted_text") or ""
+        if text and not dry_run:
+            await save_text(key_for(record), text)
+        if not dry_run:
+            await collection.update_one({"_id": record["_id"]}, {"$unset": {"extracted_text": ""}})
+        moved += 1
+    return moved
+
+
+async def main(dry_run: bool):
+    # Documents keep text under their content hash when they have one
+    documents = await migrate_collection(
+        documents_collection,
+        lambda record: record.get("content_hash") or str(record["_id"]),
+        dry_run,
+    )
+    contents = await migrate_collection(contents_collection, lambda record: record["_id"], dry_run)
+    logger.info(f"{'Would migrate' if dry_run else 'Migrated'} {documents} documents and {contents} content records")
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move extracted_text into compressed storage")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.dry_run))
@@ -0,0 +1,49 @@
+"""
+Re-encode existing per-document FAISS indexes with another index type.
+
+Usage (from backend/):
+    python -m scripts.rebuild_indexes --factory SQ8 [--only-type Flat]
+
+Defaults to the configured vector_index_factory. Vectors are reconstructed
+from each current index, so convert from Flat to compress; converting between
+two lossy types compounds the error. Flat indexes still stored as FAISS
+``.index`` files are rewritten as memory-mappable ``.vectors.npy``.
+"""
+
+import os
+import argparse
+from services.vector_store import get_vector_store
+from services.mongo_vector_store import MongoVectorStore
+
+
+def main(factory: str | None, only_type: str | None):
+    store = get_vector_store()
+    if isinstance(store, MongoVectorStore):
+        # Replica caches are rebuilt from MongoDB with the configured factory
+        store = store.local
+    factory = factory or store.index_factory
+
+    rebuilt = 0
+    for document_id in store.list_documents():
+        meta = store.get_index_meta(document_id)
+        current = meta["index_type"]
+        if only_type and current != only_type:
+            continue
+        # Flat indexes stored as .index files are rewritten as mappable .vectors.npy
+        if current == factory and (factory != "Flat" or meta.get("vectors_file")):
+            continue
+
+        before = os.path.getsize(store.index_file_path(document_id))
+        result = store.rebuild_index(document_id, factory)
+        after = os.path.getsize(store.index_file_path(document_id))
+        print(f"{document_id}: {current} -> {result} ({before} -> {after} bytes)")
+        rebuilt += 1
+    print(f"Rebuilt {rebuilt} indexes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-encode per-document FAISS indexes")
+    parser.add_argument("--factory", default=None, help="FAISS factory string (default: vector_index_factory)")
+    parser.add_argument("--only-type", default=None, help="Only rebuild indexes currently of this type")
+    args = parser.parse_args()
+    main(args.factory, args.only_type)
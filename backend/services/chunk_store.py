@@ -0,0 +1,65 @@
+"""
+Compact binary storage for per-document chunk texts.
+
+Layout of a ``.chunks.bin`` file (little-endian):
+
+    magic    8 bytes   b"IFRSCHK1"
+    count    uint64    number of chunks
+    offsets  uint64 x (count + 1)   byte offsets into the blob
+    blob     UTF-8 text of all chunks, concatenated
+
+Files are opened with mmap, so fetching a hit decodes only that chunk's bytes
+and the pages are shared between processes reading the same document.
+"""
+
+import os
+import mmap
+import numpy as np
+
+MAGIC = b"IFRSCHK1"
+HEADER_SIZE = len(MAGIC) + 8
+
+
+def write_chunks(path: str, chunk_texts: list[str]):
+    """Write chunk texts in the binary format, replacing the file atomically."""
+    encoded = [text.encode("utf-8") for text in chunk_texts]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    np.cumsum([len(data) for data in encoded], out=offsets[1:])
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(encoded)).astype("<u8").tobytes())
+        f.write(offsets.tobytes())
+        for data in encoded:
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+class MappedChunks:
+    """Read-only, list-like view over a ``.chunks.bin`` file."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self._mm.close()
+            raise ValueError(f"Not a chunk store file: {path}")
+
+        count = int(np.frombuffer(self._mm, dtype="<u8", count=1, offset=len(MAGIC))[0])
+        self._offsets = np.frombuffer(self._mm, dtype="<u8", count=count + 1, offset=HEADER_SIZE)
+        self._blob_start = HEADER_SIZE + (count + 1) * 8
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> str:
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        start = self._blob_start + int(self._offsets[i])
+        end = self._blob_start + int(self._offsets[i + 1])
+        return self._mm[start:end].decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(self._count))
@@ -0,0 +1,154 @@
+"""
+Circuit breakers for the OpenAI service layer.
+
+A breaker opens after circuit_failure_threshold consecutive failed calls, or
+the same number of consecutive calls slower than circuit_slow_call_ms. While
+it is open, calls fail immediately with CircuitOpenError instead of running
+their retry loops. After circuit_reset_seconds one probe call is let through
+(half-open). Success closes the breaker again and failure re-opens it.
+"""
+
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from openai import APITimeoutError, APIConnectionError, RateLimitError, InternalServerError
+
+logger = logging.getLogger("ifrs.circuit_breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Errors that indicate the upstream is unhealthy; anything else (e.g. a rejected
+# request) means it answered, and counts as a success
+UPSTREAM_ERRORS = (APITimeoutError, APIConnectionError, RateLimitError, InternalServerError)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open; retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, slow_call_ms: float = 30000, reset_seconds: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call = slow_call_ms / 1000
+        self.reset_seconds = reset_seconds
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self.consecutive_slow = 0
+        self._probing = False
+        self.trips = 0
+        self.rejected = 0
+
+    @property
+    def is_closed(self) -> bool:
+        return self._current_state() == CLOSED
+
+    def _current_state(self) -> str:
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = HALF_OPEN
+        return self.state
+
+    def _trip(self, reason: str):
+        if self.state != OPEN:
+            self.trips += 1
+            logger.error(f"{self.name} circuit opened: {reason}")
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+
+    def raise_if_open(self):
+        """Fail fast before queueing for a call that would be rejected anyway."""
+        if self._current_state() == OPEN:
+            self.rejected += 1
+            raise CircuitOpenError(self.name, self.reset_seconds - (time.monotonic() - self.opened_at))
+
+    def _admit(self):
+        state = self._current_state()
+        if state == CLOSED:
+            return
+        if state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return
+        self.rejected += 1
+        retry_after = max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+        raise CircuitOpenError(self.name, retry_after)
+
+    def _record(self, ok: bool, elapsed: float):
+        probing, self._probing = self._probing, False
+        if not ok:
+            self.consecutive_failures += 1
+            self.consecutive_slow = 0
+            if probing or self.consecutive_failures >= self.failure_threshold:
+                self._trip(f"{self.consecutive_failures} consecutive failures")
+            return
+
+        self.consecutive_failures = 0
+        if elapsed > self.slow_call:
+            self.consecutive_slow += 1
+            if probing or self.consecutive_slow >= self.failure_threshold:
+                self._trip(f"{self.consecutive_slow} consecutive calls slower than {self.slow_call:.0f}s")
+                return
+        else:
+            self.consecutive_slow = 0
+
+        if self.state != CLOSED:
+            logger.info(f"{self.name} circuit closed")
+        self.state = CLOSED
+
+    @asynccontextmanager
+    async def guard(self):
+        """Wrap one upstream call attempt; raises CircuitOpenError while open."""
+        self._admit()
+        start = time.monotonic()
+        try:
+            yield
+        except UPSTREAM_ERRORS:
+            self._record(False, time.monotonic() - start)
+            raise
+        except asyncio.CancelledError:
+            self._probing = False
+            raise
+        except BaseException:
+            self._record(True, time.monotonic() - start)
+            raise
+        self._record(True, time.monotonic() - start)
+
+    def stats(self) -> dict:
+        return {
+            "state": self._current_state(),
+            "consecutive_failures": self.consecutive_failures,
+            "consecutive_slow": self.consecutive_slow,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
+
+
+# Singleton instances — initialized lazily from config
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Breaker for an upstream: "chat" or "embeddings"."""
+    if name not in _breakers:
+        from config import get_settings
+        settings = get_settings()
+        _breakers[name] = CircuitBreaker(
+            name,
+            settings.circuit_failure_threshold,
+            settings.circuit_slow_call_ms,
+            settings.circuit_reset_seconds,
+        )
+    return _breakers[name]
+
+
+def breaker_stats() -> dict:
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
@@ -0,0 +1,435 @@
+"""
+Company-level vector indexes for semantic search across a company's documents.
+
+Each company has its own shard directory. A shard is a list of immutable
+segments, each an HNSW index over a contiguous range of vector IDs with the
+matching chunk texts beside it (``segment.{n}.chunks.bin``), plus a JSON
+manifest mapping vector ID ranges to document IDs. Adding a document writes a
+segment holding only that document; the newest segment is merged into its
+predecessor while the predecessor is at most SEGMENT_MERGE_FACTOR times larger,
+so a shard keeps a logarithmic number of segments and each vector is rewritten
+a logarithmic number of times. Deleting a document drops its range from the
+manifest, which leaves a tombstone. The shard is rebuilt as one segment once
+tombstones exceed company_index_compact_ratio.
+
+Writers from the API and worker processes serialize on a per-shard flock.
+Segment files are never modified and the manifest is replaced atomically, so
+readers never need the lock.
+
+Shards live under faiss_index_dir, which only the processes of one host share.
+With the "mongo" vector backend each replica therefore treats its shards as a
+cache. Before searching, it reconciles a company's shard with the company's
+completed documents in MongoDB, at most every vector_sync_interval seconds. It
+adds documents indexed elsewhere, with vectors from the shared vector store,
+and drops deleted ones.
+"""
+
+import os
+import json
+import time
+import fcntl
+import asyncio
+import logging
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable
+import numpy as np
+import faiss
+from services.chunk_store import MappedChunks, write_chunks
+from services.vector_store import VectorStore, get_vector_store
+
+logger = logging.getLogger("ifrs.company_index")
+
+MANIFEST = "manifest.json"
+MAX_CACHED_SHARDS = 32
+SEGMENT_MERGE_FACTOR = 4
+
+
+class _Segment:
+    """An opened segment covering vector IDs [start, start + index.ntotal)."""
+
+    def __init__(self, start: int, index: faiss.Index, texts: MappedChunks | None):
+        self.start = start
+        self.index = index
+        # None for shards written before segments kept their texts
+        self.texts = texts
+
+
+class CompanyIndexStore:
+    """Per-company segmented HNSW shards with document-tagged vector ranges."""
+
+    def __init__(
+        self,
+        root_dir: str,
+        vector_store: VectorStore,
+        dimension: int = 1536,
+        hnsw_m: int = 32,
+        ef_search: int = 64,
+        compact_ratio: float = 0.3,
+        catalog: Callable[[str], dict[str, str]] | None = None,
+        sync_interval: float = 30.0,
+    ):
+        self.root_dir = root_dir
+        self.vector_store = vector_store
+        self.dimension = dimension
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.compact_ratio = compact_ratio
+        # company_id -> {document_id: index_id} of the documents a shard should hold
+        self.catalog = catalog
+        self.sync_interval = sync_interval
+
+        # company_id -> monotonic time the shard was last reconciled with the catalog
+        self._synced: dict[str, float] = {}
+        # company_id -> (version, segments, manifest, sorted range starts, document IDs by start)
+        self._cache: OrderedDict[str, tuple] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        os.makedirs(root_dir, exist_ok=True)
+
+    def _shard_dir(self, company_id: str) -> str:
+        return os.path.join(self.root_dir, company_id)
+
+    def _shard_path(self, company_id: str, name: str) -> str:
+        return os.path.join(self._shard_dir(company_id), name)
+
+    @contextmanager
+    def _locked(self, company_id: str):
+        shard_dir = self._shard_dir(company_id)
+        os.makedirs(shard_dir, exist_ok=True)
+        with open(os.path.join(shard_dir, "lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_manifest(self, company_id: str) -> dict | None:
+        path = self._shard_path(company_id, MANIFEST)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            manifest = json.load(f)
+        if "segments" not in manifest:
+            # Single-index shard written before segments; its texts live in the document stores
+            index_file = manifest.pop("index_file", None)
+            manifest["segments"] = [
+                {"index_file": index_file, "chunks_file": None, "start": 0, "count": manifest["ntotal"]}
+            ] if index_file else []
+        return manifest
+
+    @staticmethod
+    def _empty_manifest() -> dict:
+        return {"version": 0, "ntotal": 0, "segments": [], "documents": {}}
+
+    def _new_index(self) -> faiss.Index:
+        return faiss.IndexHNSWFlat(self.dimension, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+
+    def _segment_texts(self, company_id: str, segment: dict, manifest: dict) -> list[str]:
+        """All chunk texts of a segment, by vector ID; empty for tombstones in legacy shards."""
+        if segment["chunks_file"]:
+            return list(MappedChunks(self._shard_path(company_id, segment["chunks_file"])))
+
+        texts = [""] * segment["count"]
+        for entry in manifest["documents"].values():
+            offset = entry["start"] - segment["start"]
+            if 0 <= offset < segment["count"]:
+                doc_texts = self.vector_store.get_chunk_texts(entry["index_id"])
+                for i in range(min(entry["count"], len(doc_texts))):
+                    texts[offset + i] = doc_texts[i]
+        return texts
+
+    def _write_shard(self, company_id: str, manifest: dict, new_segment: tuple | None = None):
+        """Write an optional new segment (descriptor, index, texts), then publish the manifest.
+
+        Segment files no longer referenced are removed after publishing.
+        """
+        old_files = {
+            name for segment in (self._read_manifest(company_id) or {"segments": []})["segments"]
+            for name in (segment["index_file"], segment["chunks_file"]) if name
+        }
+        manifest["version"] += 1
+
+        if new_segment is not None:
+            segment, index, texts = new_segment
+            segment["index_file"] = f"segment.{manifest['version']}.faiss"
+            segment["chunks_file"] = f"segment.{manifest['version']}.chunks.bin"
+            faiss.write_index(index, self._shard_path(company_id, segment["index_file"]))
+            write_chunks(self._shard_path(company_id, segment["chunks_file"]), texts)
+            manifest["segments"].append(segment)
+
+        tmp_path = self._shard_path(company_id, f"{MANIFEST}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._shard_path(company_id, MANIFEST))
+
+        live = {
+            name for segment in manifest["segments"]
+            for name in (segment["index_file"], segment["chunks_file"]) if name
+        }
+        for name in old_files - live:
+            try:
+                os.remove(self._shard_path(company_id, name))
+            except FileNotFoundError:
+                pass
+
+    def _compact(self, company_id: str, manifest: dict) -> tuple | None:
+        """Rebuild the live documents as one segment; returns it for _write_shard."""
+        opened = {
+            segment["start"]: (
+                segment,
+                faiss.read_index(self._shard_path(company_id, segment["index_file"])),
+                self._segment_texts(company_id, segment, manifest),
+            )
+            for segment in manifest["segments"]
+        }
+        starts = sorted(opened)
+
+        index = self._new_index()
+        texts: list[str] = []
+        position = 0
+        for entry in sorted(manifest["documents"].values(), key=lambda e: e["start"]):
+            segment, segment_index, segment_texts = opened[starts[bisect_right(starts, entry["start"]) - 1]]
+            offset = entry["start"] - segment["start"]
+            index.add(segment_index.reconstruct_n(offset, entry["count"]))
+            texts += segment_texts[offset:offset + entry["count"]]
+            entry["start"] = position
+            position += entry["count"]
+
+        manifest["ntotal"] = position
+        manifest["segments"] = []
+        if position == 0:
+            return None
+        return {"start": 0, "count": position}, index, texts
+
+    def add_document(self, company_id: str, document_id: str, index_id: str):
+        """Append a completed document's chunk vectors and texts to its company shard."""
+        vectors = self.vector_store.get_vectors(index_id)
+        if vectors is None or len(vectors) == 0:
+            return
+        texts = list(self.vector_store.get_chunk_texts(index_id))
+        texts += [""] * (len(vectors) - len(texts))
+
+        with self._locked(company_id):
+            manifest = self._read_manifest(company_id) or self._empty_manifest()
+            if document_id in manifest["documents"]:
+                return
+
+            segment = {"start": manifest["ntotal"], "count": len(vectors)}
+            index = self._new_index()
+            index.add(np.ascontiguousarray(vectors, dtype="float32"))
+            manifest["documents"][document_id] = {
+                "index_id": index_id,
+                "start": manifest["ntotal"],
+                "count": len(vectors),
+            }
+            manifest["ntotal"] += len(vectors)
+
+            # Merge into predecessors that are not much larger than the new segment
+            segments = manifest["segments"]
+            while segments and segments[-1]["count"] <= segment["count"] * SEGMENT_MERGE_FACTOR:
+                older = segments.pop()
+                older_index = faiss.read_index(self._shard_path(company_id, older["index_file"]))
+                older_index.add(index.reconstruct_n(0, index.ntotal))
+                texts = self._segment_texts(company_id, older, manifest) + texts
+                index = older_index
+                segment = {"start": older["start"], "count": older["count"] + segment["count"]}
+
+            self._write_shard(company_id, manifest, (segment, index, texts))
+
+        logger.info(f"Added {len(vectors)} vectors for document {document_id} to company index {company_id}")
+
+    def remove_document(self, company_id: str, document_id: str):
+        """Drop a document from its company shard, compacting if tombstones pile up."""
+        with self._locked(company_id):
+            manifest = self._read_manifest(company_id)
+            if manifest is None or document_id not in manifest["documents"]:
+                return
+
+            del manifest["documents"][document_id]
+            live = sum(entry["count"] for entry in manifest["documents"].values())
+            dead = manifest["ntotal"] - live
+            new_segment = None
+            if manifest["ntotal"] and dead / manifest["ntotal"] > self.compact_ratio:
+                logger.info(f"Compacting company index {company_id} ({dead} tombstoned vectors)")
+                new_segment = self._compact(company_id, manifest)
+            self._write_shard(company_id, manifest, new_segment)
+
+        logger.info(f"Removed document {document_id} from company index {company_id}")
+
+    def _sync(self, company_id: str):
+        """Reconcile a company's shard with the catalog, if one is configured."""
+        if self.catalog is None:
+            return
+        now = time.monotonic()
+        with self._cache_lock:
+            checked = self._synced.get(company_id)
+        if checked is not None and now - checked < self.sync_interval:
+            return
+
+        documents = self.catalog(company_id)
+        indexed = (self._read_manifest(company_id) or self._empty_manifest())["documents"]
+        removed = indexed.keys() - documents.keys()
+        added = documents.keys() - indexed.keys()
+        for document_id in removed:
+            self.remove_document(company_id, document_id)
+        for document_id in added:
+            self.add_document(company_id, document_id, documents[document_id])
+        if removed or added:
+            logger.info(
+                f"Synced company index {company_id}: {len(added)} documents added, {len(removed)} removed"
+            )
+
+        with self._cache_lock:
+            self._synced[company_id] = now
+
+    def _load(self, company_id: str) -> tuple | None:
+        """Return the cached shard for a company, reopening only segments that changed."""
+        for _ in range(2):
+            manifest = self._read_manifest(company_id)
+            if manifest is None:
+                return None
+
+            with self._cache_lock:
+                cached = self._cache.get(company_id)
+                if cached is not None and cached[0] == manifest["version"]:
+                    self._cache.move_to_end(company_id)
+                    return cached
+
+            # Segment files are immutable, so ones already open can be reused
+            previous = {}
+            if cached is not None:
+                previous = {
+                    segment["index_file"]: opened
+                    for segment, opened in zip(cached[2]["segments"], cached[1])
+                }
+            try:
+                segments = []
+                for segment in manifest["segments"]:
+                    opened = previous.get(segment["index_file"])
+                    if opened is None:
+                        index = faiss.read_index(self._shard_path(company_id, segment["index_file"]))
+                        texts = None
+                        if segment["chunks_file"]:
+                            texts = MappedChunks(self._shard_path(company_id, segment["chunks_file"]))
+                        opened = _Segment(segment["start"], index, texts)
+                    segments.append(opened)
+            except (RuntimeError, FileNotFoundError):
+                continue  # Replaced by a concurrent writer; re-read the manifest
+
+            ranges = sorted((e["start"], doc_id) for doc_id, e in manifest["documents"].items())
+            entry = (manifest["version"], segments, manifest, [r[0] for r in ranges], [r[1] for r in ranges])
+            with self._cache_lock:
+                self._cache[company_id] = entry
+                while len(self._cache) > MAX_CACHED_SHARDS:
+                    self._cache.popitem(last=False)
+            return entry
+        return None
+
+    def search(self, company_id: str, query_vector: list[float], top_k: int = 10) -> list[dict]:
+        """Return the top chunks across all of a company's documents."""
+        self._sync(company_id)
+        loaded = self._load(company_id)
+        if loaded is None:
+            return []
+
+        _, segments, manifest, starts, doc_ids = loaded
+        if not doc_ids:
+            return []
+
+        # Over-fetch so tombstoned hits can be dropped without a second search
+        fetch = top_k * 2 + 10
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = max(self.ef_search, fetch)
+
+        query = np.array([query_vector], dtype="float32")
+        faiss.normalize_L2(query)
+
+        candidates = []
+        for segment in segments:
+            k = min(segment.index.ntotal, fetch)
+            if k == 0:
+                continue
+            scores, ids = segment.index.search(query, k, params=params)
+            candidates += [(float(score), int(i), segment) for score, i in zip(scores[0], ids[0]) if i >= 0]
+        candidates.sort(key=lambda c: -c[0])
+
+        hits = []
+        for score, local_id, segment in candidates:
+            vector_id = segment.start + local_id
+            position = bisect_right(starts, vector_id) - 1
+            if position < 0:
+                continue
+            document_id = doc_ids[position]
+            entry = manifest["documents"][document_id]
+            chunk_index = vector_id - entry["start"]
+            if chunk_index >= entry["count"]:
+                continue  # Tombstoned range from a deleted document
+
+            if segment.texts is not None:
+                text = segment.texts[local_id]
+            else:
+                texts = self.vector_store.get_chunk_texts(entry["index_id"])
+                text = texts[chunk_index] if chunk_index < len(texts) else ""
+            hits.append({
+                "document_id": document_id,
+                "chunk_index": chunk_index,
+                "score": round(score, 4),
+                "text": text,
+            })
+            if len(hits) == top_k:
+                break
+        return hits
+
+
+def _mongo_catalog(settings) -> Callable[[str], dict[str, str]]:
+    """Catalog of a company's completed documents read from MongoDB."""
+    from pymongo import MongoClient
+    from database import documents_collection
+
+    # Synchronous client: the company index runs on worker threads
+    client = MongoClient(settings.mongodb_uri)
+    collection = client[settings.database_name][documents_collection.name]
+
+    def documents(company_id: str) -> dict[str, str]:
+        return {
+            str(doc["_id"]): doc.get("index_id") or str(doc["_id"])
+            for doc in collection.find({"company_id": company_id, "status": "completed"}, {"index_id": 1})
+        }
+
+    return documents
+
+
+# Singleton instance — initialized lazily from config
+_company_store: CompanyIndexStore | None = None
+
+
+def get_company_index() -> CompanyIndexStore:
+    global _company_store
+    if _company_store is None:
+        from config import get_settings
+        settings = get_settings()
+        _company_store = CompanyIndexStore(
+            os.path.join(settings.faiss_index_dir, "companies"),
+            get_vector_store(),
+            settings.embedding_dimension,
+            settings.company_index_hnsw_m,
+            settings.company_index_ef_search,
+            settings.company_index_compact_ratio,
+            # Shards are per replica; rebuild them from the shared backend's documents
+            _mongo_catalog(settings) if settings.vector_backend == "mongo" else None,
+            settings.vector_sync_interval,
+        )
+    return _company_store
+
+
+async def index_completed_documents(content_hash: str):
+    """Add every completed document sharing this content to its company index."""
+    from database import documents_collection
+
+    store = get_company_index()
+    async for doc in documents_collection.find(
+        {"content_hash": content_hash, "status": "completed"}, {"company_id": 1}
+    ):
+        await asyncio.to_thread(store.add_document, doc["company_id"], str(doc["_id"]), content_hash)
@@ -0,0 +1,88 @@
+"""
+Content-addressed storage of per-upload artifacts.
+
+Byte-identical uploads share one content record keyed by SHA-256. The
+extracted text (see text_store) and the vector index are stored under the
+content hash. Documents reference it via content_hash / index_id, and a
+reference count decides when the shared artifacts can be removed.
+"""
+
+import os
+import logging
+from datetime import datetime, timezone
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from database import contents_collection, documents_collection
+from services.vector_store import get_async_vector_store
+from services.text_store import delete_text
+
+logger = logging.getLogger("ifrs.content_store")
+
+
+async def acquire_content(content_hash: str, file_path: str, file_size: int) -> dict:
+    """Add a reference to the content record for a hash, creating it if new.
+
+    Returns the content record after the increment. If the content already
+    existed, its file_url points at the previously stored copy.
+    """
+    for _ in range(2):
+        try:
+            return await contents_collection.find_one_and_update(
+                {"_id": content_hash},
+                {
+                    "$inc": {"ref_count": 1},
+                    "$setOnInsert": {
+                        "status": "processing",
+                        "file_url": file_path,
+                        "file_size": file_size,
+                        "created_at": datetime.now(timezone.utc),
+                    },
+                },
+                projection={"status": 1, "file_url": 1, "ref_count": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Lost an upsert race with a concurrent identical upload; retry as an update
+            continue
+    raise RuntimeError(f"Could not acquire content record {content_hash}")
+
+
+async def release_content(content_hash: str):
+    """Drop a reference and remove the shared artifacts once none remain."""
+    record = await contents_collection.find_one_and_update(
+        {"_id": content_hash},
+        {"$inc": {"ref_count": -1}},
+        projection={"ref_count": 1, "file_url": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not record or record["ref_count"] > 0:
+        return
+
+    result = await contents_collection.delete_one({"_id": content_hash, "ref_count": {"$lte": 0}})
+    if result.deleted_count == 0:
+        return  # Re-acquired concurrently
+
+    await delete_content_artifacts(content_hash, record.get("file_url"))
+    logger.info(f"Released last reference to content {content_hash}")
+
+
+async def delete_content_artifacts(content_hash: str, file_url: str | None = None):
+    """Remove the vector index, extracted text and (optionally) stored file of a content hash."""
+    await get_async_vector_store().delete_document(content_hash)
+    await delete_text(content_hash)
+    if file_url and os.path.exists(file_url):
+        os.remove(file_url)
+
+
+async def resolve_index_id(document_id: str) -> str:
+    """Map a document ID to the key of its vector index.
+
+    Documents uploaded before content addressing have their index stored under
+    the document ID itself.
+    """
+    doc = await documents_collection.find_one({"_id": ObjectId(document_id)}, {"index_id": 1})
+    if doc and doc.get("index_id"):
+        return doc["index_id"]
+    return document_id
@@ -0,0 +1,115 @@
+"""
+Token-budgeted prompt context from retrieved chunks.
+
+Retrieved chunks overlap their neighbours by chunk_overlap tokens and often
+repeat each other, so joining them verbatim sends redundant tokens. The packer:
+
+1. drops exact and near-duplicate chunks (shingle Jaccard >= NEAR_DUPLICATE),
+2. merges chunks, in document order (ChunkHit.position), whose end overlaps
+   the next one's start into one passage, ranked by its best chunk,
+3. keeps the highest-ranked passages that fit the token budget, truncating
+   the top passage only if it alone exceeds it,
+4. joins the kept passages in document order.
+
+Merging only removes repeated text and the budget is charged for merged
+passages. With the default context_token_budget of 0 there is no cap, so
+everything retrieved reaches the prompt without its repeats.
+"""
+
+import logging
+import tiktoken
+from services.vector_store import ChunkHit
+
+logger = logging.getLogger("ifrs.context_packer")
+
+NEAR_DUPLICATE = 0.9
+SHINGLE = 5
+MIN_MERGE_CHARS = 40
+SEPARATOR = "\n\n"
+
+_encoder = None
+
+
+def _enc():
+    global _encoder
+    if _encoder is None:
+        _encoder = tiktoken.get_encoding("cl100k_base")
+    return _encoder
+
+
+def _shingles(tokens: list[int]) -> set[tuple[int, ...]]:
+    if len(tokens) <= SHINGLE:
+        return {tuple(tokens)}
+    return {tuple(tokens[i:i + SHINGLE]) for i in range(len(tokens) - SHINGLE + 1)}
+
+
+def _overlap(left: str, right: str, max_chars: int) -> int:
+    """Length of the longest suffix of left that is a prefix of right."""
+    for start in range(max(0, len(left) - max_chars), len(left)):
+        if right.startswith(left[start:]):
+            return len(left) - start
+    return 0
+
+
+def pack_context(chunks: list[ChunkHit], budget_tokens: int | None = None) -> str:
+    """Build a deduplicated, position-ordered context from ranked hits.
+
+    The context is capped at budget_tokens, or context_token_budget when not
+    given; a budget of 0 keeps every distinct passage.
+    """
+    from config import get_settings
+    settings = get_settings()
+    budget = budget_tokens if budget_tokens is not None else settings.context_token_budget
+    enc = _enc()
+
+    # 1. Deduplicate, keeping rank order (best first)
+    kept: list[tuple[ChunkHit, set]] = []
+    seen_positions = set()
+    raw_tokens = 0
+    for hit in chunks:
+        if hit.position in seen_positions:
+            continue
+        tokens = enc.encode(hit.text)
+        raw_tokens += len(tokens)
+        shingles = _shingles(tokens)
+        if any(len(shingles & other) / len(shingles | other) >= NEAR_DUPLICATE for _, other in kept):
+            continue
+        seen_positions.add(hit.position)
+        kept.append((hit, shingles))
+
+    # 2. Merge overlapping neighbours in document order; [best rank, text] per passage
+    max_overlap = settings.chunk_overlap * 8  # ~4 chars per token, with margin
+    passages: list[list] = []
+    for rank, hit in sorted(enumerate(hit for hit, _ in kept), key=lambda item: item[1].position):
+        if passages:
+            shared = _overlap(passages[-1][1], hit.text, max_overlap)
+            if shared >= MIN_MERGE_CHARS:
+                passages[-1][0] = min(passages[-1][0], rank)
+                passages[-1][1] += hit.text[shared:]
+                continue
+        passages.append([rank, hit.text])
+
+    # 3. Fit the budget with the best-ranked passages
+    texts = [text for _, text in passages]
+    if budget > 0:
+        selected: dict[int, str] = {}
+        used = 0
+        for i in sorted(range(len(passages)), key=lambda i: passages[i][0]):
+            tokens = enc.encode(texts[i])
+            if used + len(tokens) > budget:
+                if not selected:
+                    selected[i] = enc.decode(tokens[:budget])
+                    break
+                continue
+            selected[i] = texts[i]
+            used += len(tokens)
+        # 4. Back in document order
+        texts = [selected[i] for i in sorted(selected)]
+
+    context = SEPARATOR.join(texts)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            f"Packed {len(chunks)} chunks into {len(texts)} passages "
+            f"({raw_tokens} -> {len(enc.encode(context))} tokens)"
+        )
+    return context
@@ -0,0 +1,157 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger("ifrs.embedding_cache")
+
+# last_used updates are buffered and written in one batch this often
+TOUCH_FLUSH_SIZE = 1000
+TOUCH_FLUSH_SECONDS = 30
+# Eviction trims to this fraction of max_entries so it does not run on every put
+EVICT_TO = 0.9
+
+
+class EmbeddingCache:
+    """Persistent chunk-embedding cache keyed by (model, dimension, text hash).
+
+    Backed by a local SQLite file. Entries carry a last-used timestamp and the
+    least recently used ones are evicted once max_entries is exceeded. The row
+    count is tracked in memory and re-read from the table only before evicting;
+    lookups buffer their last-used updates and write them in batches.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # (model, dimension, text_hash) -> last-used time not yet written
+        self._touched: dict[tuple[str, int, str], float] = {}
+        self._touched_since = time.monotonic()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                dimension INTEGER NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, dimension, text_hash)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        logger.info(f"Embedding cache initialized at {path} (max_entries={max_entries})")
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, dimension: int, texts: list[str]) -> dict[int, list[float]]:
+        """Look up texts; returns {position: embedding} for the hits."""
+        hashes = [self.text_hash(t) for t in texts]
+        found = {}
+
+        with self._lock:
+            unique = list(set(hashes))
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND dimension = ? AND text_hash IN ({placeholders})",
+                    [model, dimension, *batch],
+                ).fetchall()
+                found.update({h: np.frombuffer(v, dtype="float32").tolist() for h, v in rows})
+
+            if found:
+                now = time.time()
+                if not self._touched:
+                    self._touched_since = time.monotonic()
+                self._touched.update(((model, dimension, h), now) for h in found)
+                if (
+                    len(self._touched) >= TOUCH_FLUSH_SIZE
+                    or time.monotonic() - self._touched_since >= TOUCH_FLUSH_SECONDS
+                ):
+                    self._flush_touched()
+                    self._conn.commit()
+
+            result = {i: found[h] for i, h in enumerate(hashes) if h in found}
+            self.hits += len(result)
+            self.misses += len(texts) - len(result)
+
+        return result
+
+    def put_many(self, model: str, dimension: int, texts: list[str], embeddings: list[list[float]]):
+        """Store embeddings and evict least recently used entries over the limit."""
+        now = time.time()
+        rows = [
+            (model, dimension, self.text_hash(t), np.asarray(e, dtype="float32").tobytes(), now)
+            for t, e in zip(texts, embeddings)
+        ]
+
+        with self._lock:
+            # Same model and text always give the same vector; existing rows stay as they are
+            inserted = self._conn.executemany("INSERT OR IGNORE INTO embeddings VALUES (?, ?, ?, ?, ?)", rows)
+            self._count += max(inserted.rowcount, 0)
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _flush_touched(self):
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND dimension = ? AND text_hash = ?",
+                [(used, *key) for key, used in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self):
+        # Other processes may share the file, so recount before deleting
+        self._flush_touched()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = self._count - int(self.max_entries * EVICT_TO)
+        if self._count > self.max_entries and excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            self._count -= excess
+            self.evictions += excess
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Singleton instance — initialized lazily from config
+_cache: EmbeddingCache | None = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _cache
+    if _cache is None:
+        from config import get_settings
+        settings = get_settings()
+        _cache = EmbeddingCache(settings.embedding_cache_path, settings.embedding_cache_max_entries)
+    return _cache
@@ -0,0 +1,93 @@
+"""
+Micro-batching for single-text embedding requests.
+
+Concurrent get_embedding calls that arrive within embedding_coalesce_window_ms
+of each other are sent as one batched embeddings request, and each caller
+receives its own vector. A batch is flushed early once it reaches
+embedding_coalesce_max_batch texts. Identical texts in a batch are embedded once.
+If a batch fails with one of the isolate_errors (a rejected input), its texts
+are retried one by one so a single bad text only fails its own caller.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger("ifrs.embedding_coalescer")
+
+
+class EmbeddingCoalescer:
+    """Collects single-text requests and embeds them in batches."""
+
+    def __init__(
+        self,
+        embed_batch: Callable[[list[str]], Awaitable[list[list[float]]]],
+        window_ms: float = 5.0,
+        max_batch: int = 64,
+        isolate_errors: tuple[type[Exception], ...] = (),
+    ):
+        self.embed_batch = embed_batch
+        self.isolate_errors = isolate_errors
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+
+        self._pending: dict[str, list[asyncio.Future]] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.requests = 0
+        self.batches = 0
+
+    async def embed(self, text: str) -> list[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(text, []).append(future)
+        self.requests += 1
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        self.batches += 1
+        task = asyncio.get_running_loop().create_task(self._run(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, pending: dict[str, list[asyncio.Future]]):
+        texts = list(pending)
+        try:
+            embeddings = await self.embed_batch(texts)
+        except Exception as e:
+            if len(texts) > 1 and isinstance(e, self.isolate_errors):
+                await asyncio.gather(*(self._run({text: futures}) for text, futures in pending.items()))
+                return
+            for futures in pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        if len(texts) > 1:
+            logger.debug(f"Coalesced {sum(len(f) for f in pending.values())} embedding requests into one call")
+        for text, embedding in zip(texts, embeddings):
+            for future in pending[text]:
+                if not future.done():
+                    future.set_result(embedding)
+
+    def stats(self) -> dict:
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "requests": self.requests,
+            "batches": self.batches,
+            "requests_per_batch": round(self.requests / self.batches, 2) if self.batches else 0.0,
+        }
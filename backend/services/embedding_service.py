@@ -1,40 +1,196 @@
+import asyncio
+import logging
+import numpy as np
+from contextlib import aclosing
+from typing import AsyncIterator, Awaitable, Callable
 import tiktoken
-from services.openai_service import get_embedding
-from services.vector_store import get_vector_store
+from services.openai_service import get_embeddings
+from services.vector_store import get_async_vector_store
+from services.embedding_cache import get_embedding_cache
 from config import get_settings
 
+logger = logging.getLogger("ifrs.embedding")
 settings = get_settings()
 
 
+class TokenChunker:
+    """Incremental form of chunk_text: feed text as it arrives and receive
+    overlapping token windows, with windows spanning feed boundaries."""
+
+    def __init__(self, chunk_size: int = 800, overlap: int = 100):
+        self.enc = tiktoken.get_encoding("cl100k_base")
+        self.chunk_size = chunk_size
+        self.step = max(1, chunk_size - overlap)
+        self._tokens = []
+
+    def _emit(self) -> tuple[str, int]:
+        window = self._tokens[:self.chunk_size]
+        self._tokens = self._tokens[self.step:]
+        return self.enc.decode(window), len(window)
+
+    def feed(self, text: str) -> list[tuple[str, int]]:
+        """Add text; returns the (chunk, token_count) windows that are now complete."""
+        self._tokens.extend(self.enc.encode(text))
+        chunks = []
+        while len(self._tokens) >= self.chunk_size:
+            chunks.append(self._emit())
+        return chunks
+
+    def flush(self) -> list[tuple[str, int]]:
+        """Return the remaining, possibly short, windows at end of input."""
+        chunks = []
+        while self._tokens:
+            chunks.append(self._emit())
+        return chunks
+
+
 def chunk_text(text: str, chunk_size: int = 800, overlap: int = 100):
+    chunker = TokenChunker(chunk_size, overlap)
+    return [chunk for chunk, _ in chunker.feed(text) + chunker.flush()]
+
+
+def batch_chunks(chunks: list[str], max_items: int, max_tokens: int) -> list[list[str]]:
+    """Group chunks into embedding batches bounded by item count and token budget."""
     enc = tiktoken.get_encoding("cl100k_base")
-    tokens = enc.encode(text)
 
-    chunks = []
-    start = 0
+    batches = []
+    current = []
+    current_tokens = 0
+
+    for chunk in chunks:
+        n_tokens = len(enc.encode(chunk))
+        if current and (len(current) >= max_items or current_tokens + n_tokens > max_tokens):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(chunk)
+        current_tokens += n_tokens
+
+    if current:
+        batches.append(current)
+
+    return batches
+
+
+async def _embed_uncached(chunks: list[str]) -> list[list[float]]:
+    """Embed chunks in token-budgeted batches, running several batches concurrently."""
+    batches = batch_chunks(chunks, settings.embedding_batch_size, settings.embedding_batch_tokens)
+    semaphore = asyncio.Semaphore(settings.embedding_concurrency)
+
+    async def _embed(batch: list[str]) -> list[list[float]]:
+        async with semaphore:
+            return await get_embeddings(batch)
+
+    results = await asyncio.gather(*(_embed(batch) for batch in batches))
+    logger.info(f"Embedded {len(chunks)} chunks in {len(batches)} batches")
+
+    return [embedding for batch in results for embedding in batch]
 
-    while start < len(tokens):
-        end = start + chunk_size
-        chunk_tokens = tokens[start:end]
-        chunks.append(enc.decode(chunk_tokens))
-        start += chunk_size - overlap
 
-    return chunks
+async def embed_chunks(chunks: list[str]) -> list[list[float]]:
+    """Embed chunks, serving repeats from the persistent cache and calling the API for misses only."""
+    return await _embed_cached(chunks, _embed_uncached)
+
+
+async def _embed_cached(
+    chunks: list[str], embed: Callable[[list[str]], Awaitable[list[list[float]]]]
+) -> list[list[float]]:
+    cache = get_embedding_cache()
+    model, dimension = settings.embedding_model, settings.embedding_dimension
+
+    embeddings = await asyncio.to_thread(cache.get_many, model, dimension, chunks)
+    reused = len(embeddings)
+    misses = list(dict.fromkeys(chunk for i, chunk in enumerate(chunks) if i not in embeddings))
+
+    if misses:
+        fresh = await embed(misses)
+        await asyncio.to_thread(cache.put_many, model, dimension, misses, fresh)
+        by_text = dict(zip(misses, fresh))
+        for i, chunk in enumerate(chunks):
+            if i not in embeddings:
+                embeddings[i] = by_text[chunk]
+
+    logger.info(f"Embedding cache: {reused} of {len(chunks)} chunks reused")
+    return [embeddings[i] for i in range(len(chunks))]
 
 
 async def embed_and_store(document_id: str, text: str):
     chunks = chunk_text(text, settings.chunk_size, settings.chunk_overlap)
+    embeddings = await embed_chunks(chunks)
 
-    embeddings = []
-    chunk_texts = []
+    vector_store = get_async_vector_store()
+    await vector_store.add_vectors(document_id, embeddings, chunks)
 
-    for chunk in chunks:
-        embedding = await get_embedding(chunk)
-        embeddings.append(embedding)
-        chunk_texts.append(chunk)
+    return len(chunks)
+
+
+async def embed_and_store_stream(document_id: str, pages: AsyncIterator[str]) -> int:
+    """Chunk and embed text as it streams in, then build the document's index.
+
+    Chunking runs as a separate task feeding a bounded queue, and embedding
+    batches are dispatched while later pages are still being extracted. At most
+    embedding_concurrency batches are in flight, so a slow embeddings API
+    throttles chunking and, through it, extraction. Finished batches are kept
+    as float32 arrays rather than lists of Python floats.
+
+    A failure in extraction, chunking or embedding is raised as itself, not
+    wrapped in an ExceptionGroup.
+    """
+    chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.ingest_queue_size)
+    semaphore = asyncio.Semaphore(settings.embedding_concurrency)
+    batches: list[list[str]] = []
+    results: dict[int, np.ndarray] = {}
+
+    async def produce_chunks():
+        chunker = TokenChunker(settings.chunk_size, settings.chunk_overlap)
+        # Close the page source (and its extraction) if embedding fails first
+        async with aclosing(pages):
+            async for page_text in pages:
+                for item in chunker.feed(page_text + "\n"):
+                    await chunk_queue.put(item)
+        for item in chunker.flush():
+            await chunk_queue.put(item)
+        await chunk_queue.put(None)
+
+    async def embed_batch(position: int, batch: list[str]):
+        try:
+            # Batches are already sized to the API limits; send cache misses as one request
+            results[position] = np.array(await _embed_cached(batch, get_embeddings), dtype="float32")
+        finally:
+            semaphore.release()
+
+    try:
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(produce_chunks())
+
+            async def dispatch(batch: list[str]):
+                await semaphore.acquire()
+                tg.create_task(embed_batch(len(batches), batch))
+                batches.append(batch)
+
+            batch, batch_tokens = [], 0
+            while (item := await chunk_queue.get()) is not None:
+                chunk, n_tokens = item
+                if batch and (
+                    len(batch) >= settings.embedding_batch_size
+                    or batch_tokens + n_tokens > settings.embedding_batch_tokens
+                ):
+                    await dispatch(batch)
+                    batch, batch_tokens = [], 0
+                batch.append(chunk)
+                batch_tokens += n_tokens
+            if batch:
+                await dispatch(batch)
+    except* Exception as group:
+        # The first failure cancels the other tasks; surface it, not the group
+        raise group.exceptions[0] from None
+
+    chunks = [chunk for batch in batches for chunk in batch]
+    if not chunks:
+        return 0
+    embeddings = np.concatenate([results.pop(position) for position in range(len(batches))])
 
-    # 🔥 THIS WAS MISSING
-    vector_store = get_vector_store()
-    vector_store.add_vectors(document_id, embeddings, chunk_texts)
+    vector_store = get_async_vector_store()
+    await vector_store.add_vectors(document_id, embeddings, chunks)
 
     return len(chunks)
@@ -1,61 +1,352 @@
+import os
+import time
+import hashlib
 import logging
 import asyncio
-from PyPDF2 import PdfReader
+import multiprocessing
+from collections import deque
+from contextlib import aclosing
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
 from bson import ObjectId
-from database import documents_collection
-from services.embedding_service import embed_and_store
+from multipart.multipart import MultipartParser, MultipartParseError, parse_options_header
+from config import get_settings
+from database import documents_collection, contents_collection
+from services.embedding_service import embed_and_store_stream
+from services.text_store import TextWriter
+from services.company_index import index_completed_documents
+from services.content_store import delete_content_artifacts
+from services.pdf_extraction import count_pages, extract_page_range
 
 logger = logging.getLogger("ifrs.file_service")
+settings = get_settings()
 
 MAX_RETRIES = 2
+# Allowance for boundaries and part headers when checking Content-Length
+MULTIPART_OVERHEAD = 64 * 1024
 
+_pdf_pool: Executor | None = None
 
-def extract_text_from_pdf(file_path: str) -> str:
-    """Extract text from a PDF file."""
+
+class BilliardExecutor(Executor):
+    """concurrent.futures interface to a billiard process pool.
+
+    multiprocessing forbids daemonic processes, such as Celery's prefork pool
+    children, from starting children of their own; billiard, Celery's fork of
+    multiprocessing, does not, so ingestion in the worker still parses page
+    ranges in parallel processes.
+    """
+
+    def __init__(self, max_workers: int):
+        import billiard
+        # Spawn rather than fork: the worker child holds an event loop and DB client
+        self._pool = billiard.get_context("spawn").Pool(processes=max_workers)
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future = Future()
+
+        def done(result):
+            if future.set_running_or_notify_cancel():
+                future.set_result(result)
+
+        def failed(error):
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
+
+        self._pool.apply_async(fn, args, kwargs, callback=done, error_callback=failed)
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        if cancel_futures:
+            self._pool.terminate()
+        else:
+            self._pool.close()
+        if wait:
+            self._pool.join()
+
+
+def get_pdf_pool() -> Executor:
+    global _pdf_pool
+    if _pdf_pool is None:
+        if multiprocessing.current_process().daemon:
+            _pdf_pool = BilliardExecutor(max_workers=settings.pdf_workers)
+        else:
+            # Spawn rather than fork: the parent holds an event loop and DB client
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=settings.pdf_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+    return _pdf_pool
+
+
+def shutdown_pdf_pool():
+    global _pdf_pool
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown(cancel_futures=True)
+        _pdf_pool = None
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+class InvalidUploadError(ValueError):
+    pass
+
+
+class _UploadReceiver:
+    """Multipart parser callbacks collecting one file field's bytes as they are parsed."""
+
+    def __init__(self, field: str):
+        self.field = field
+        self.file_name: str | None = None
+        self.pending: list[bytes] = []
+        self._header = b""
+        self._value = b""
+        self._disposition = b""
+        self._in_file = False
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._value += data[start:end]
+
+    def on_header_end(self):
+        if self._header.lower() == b"content-disposition":
+            self._disposition = self._value
+        self._header = self._value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        if options.get(b"name") == self.field.encode() and b"filename" in options:
+            if self.file_name is not None:
+                raise InvalidUploadError("Upload one file at a time")
+            self.file_name = options[b"filename"].decode("utf-8", errors="replace")
+            self._in_file = True
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self.pending.append(data[start:end])
+
+    def on_part_end(self):
+        self._in_file = False
+
+
+async def receive_upload(request, field: str, upload_dir: str, max_bytes: int) -> tuple[str, str, int, str]:
+    """Stream one PDF file field of a multipart request body to disk.
+
+    The body is parsed as it arrives rather than spooled by Starlette first, so
+    an upload is rejected once max_bytes have been received (or up front from
+    Content-Length), and its content is hashed in the same pass. Returns
+    (file_name, file_path, size_in_bytes, sha256_hex). The partial file is
+    removed on any error.
+    """
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > max_bytes + MULTIPART_OVERHEAD:
+        raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+    _, params = parse_options_header(request.headers.get("content-type", ""))
+    if b"boundary" not in params:
+        raise InvalidUploadError("Expected a multipart/form-data upload")
+
+    receiver = _UploadReceiver(field)
+    parser = MultipartParser(params[b"boundary"], receiver.callbacks())
+    digest = hashlib.sha256()
+    size = 0
+    file_path = None
+    out = None
+
+    try:
+        try:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                if receiver.file_name is not None and out is None:
+                    if not receiver.file_name.lower().endswith(".pdf"):
+                        raise InvalidUploadError("Only PDF files are supported")
+                    safe_name = "".join(c for c in receiver.file_name if c.isalnum() or c in "._- ")
+                    file_path = os.path.join(upload_dir, f"{ObjectId()}_{safe_name}")
+                    out = open(file_path, "wb")
+                if not receiver.pending:
+                    continue
+                for block in receiver.pending:
+                    size += len(block)
+                    if size > max_bytes:
+                        raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                    digest.update(block)
+                await asyncio.to_thread(out.write, b"".join(receiver.pending))
+                receiver.pending.clear()
+            parser.finalize()
+            if receiver.file_name is None:
+                raise InvalidUploadError(f"No file uploaded in field '{field}'")
+        except MultipartParseError as e:
+            raise InvalidUploadError(f"Malformed multipart upload: {e}") from e
+        finally:
+            if out is not None:
+                out.close()
+    except BaseException:
+        if file_path is not None and os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+
+    return receiver.file_name, file_path, size, digest.hexdigest()
+
+
+async def iter_pdf_pages(file_path: str, stats: dict | None = None):
+    """Yield page texts in order while later page ranges are parsed in the PDF pool.
+
+    At most two ranges per PDF worker are in flight, so extraction only runs
+    ahead of the consumer by a bounded amount. When iteration completes,
+    extraction stats including per-page timings are written into ``stats``.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_pdf_pool()
+    start = time.perf_counter()
+
+    page_count = await loop.run_in_executor(pool, count_pages, file_path)
+    step = max(1, settings.pdf_pages_per_task)
+    starts = iter(range(0, page_count, step))
+    pending = deque()
+
+    def submit():
+        first = next(starts, None)
+        if first is not None:
+            pending.append(loop.run_in_executor(pool, extract_page_range, file_path, first, first + step))
+
+    for _ in range(max(1, settings.pdf_workers) * 2):
+        submit()
+
+    page_timings = []
+    try:
+        while pending:
+            results = await pending.popleft()
+            submit()
+            for page_text, elapsed in results:
+                page_timings.append(elapsed)
+                yield page_text
+    finally:
+        for future in pending:
+            future.cancel()
+
+    slow_pages = [i + 1 for i, elapsed in enumerate(page_timings) if elapsed >= settings.slow_page_ms]
+    if slow_pages:
+        logger.warning(f"Slow PDF pages in {file_path}: {slow_pages}")
+
+    if stats is not None:
+        stats.update({
+            "page_count": page_count,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+            "page_timings_ms": page_timings,
+            "slow_pages": slow_pages,
+        })
+
+
+async def extract_text_from_pdf(file_path: str) -> tuple[str, dict]:
+    """Extract text from a PDF in the PDF pool, parsing page ranges in parallel.
+
+    Returns the extracted text and extraction stats including per-page timings.
+    """
+    stats = {}
     try:
-        reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-        if not text.strip():
-            raise ValueError("PDF contains no extractable text")
-        return text
+        pages = [page_text async for page_text in iter_pdf_pages(file_path, stats)]
     except Exception as e:
         logger.error(f"PDF extraction failed for {file_path}: {e}")
         raise
 
+    text = "".join(page_text + "\n" for page_text in pages if page_text)
+    if not text.strip():
+        raise ValueError("PDF contains no extractable text")
+    return text, stats
+
+
+async def process_document(content_hash: str, file_path: str):
+    """Ingestion task: extract text and embed an upload's content, then mark
+    every document sharing that content as completed."""
+    content = await contents_collection.find_one({"_id": content_hash}, {"status": 1})
+    if not content:
+        logger.info(f"Content {content_hash} no longer referenced, skipping")
+        return
+    if content["status"] == "completed":
+        # Redelivered or re-enqueued after another worker finished it
+        await documents_collection.update_many(
+            {"content_hash": content_hash, "status": "processing"},
+            {"$set": {"status": "completed"}},
+        )
+        await index_completed_documents(content_hash)
+        return
 
-async def process_document(document_id: str, file_path: str):
-    """Background task: extract text, embed, and update document status."""
     for attempt in range(MAX_RETRIES + 1):
         try:
-            logger.info(f"Processing document {document_id} (attempt {attempt + 1})")
+            logger.info(f"Processing content {content_hash} (attempt {attempt + 1})")
 
-            text = extract_text_from_pdf(file_path)
-            logger.info(f"Extracted {len(text)} chars from document {document_id}")
+            # Pages stream through chunking and embedding while later pages are
+            # parsed; the text is compressed as it goes rather than kept whole
+            text = TextWriter()
+            extraction_stats = {}
 
-            await documents_collection.update_one(
-                {"_id": ObjectId(document_id)},
-                {"$set": {"extracted_text": text}},
-            )
+            async def page_source():
+                async with aclosing(iter_pdf_pages(file_path, extraction_stats)) as source:
+                    async for page_text in source:
+                        if page_text:
+                            text.write(page_text + "\n")
+                            yield page_text
 
-            chunk_count = await embed_and_store(document_id, text)
-            logger.info(f"Created {chunk_count} embeddings for document {document_id}")
+            chunk_count = await embed_and_store_stream(content_hash, page_source())
+            if text.blank:
+                raise ValueError("PDF contains no extractable text")
+            logger.info(
+                f"Extracted {text.chars} chars from {extraction_stats['page_count']} pages "
+                f"of content {content_hash} in {extraction_stats['duration_ms']}ms, "
+                f"created {chunk_count} embeddings"
+            )
 
-            await documents_collection.update_one(
-                {"_id": ObjectId(document_id)},
+            await text.save(content_hash)
+            updated = await contents_collection.update_one(
+                {"_id": content_hash},
+                {"$set": {
+                    "extraction_stats": extraction_stats,
+                    "chunk_count": chunk_count,
+                    "status": "completed",
+                }},
+            )
+            if updated.matched_count == 0:
+                # Every referencing document was deleted while this ran
+                logger.info(f"Content {content_hash} released during processing, discarding its artifacts")
+                await delete_content_artifacts(content_hash)
+                return
+            await documents_collection.update_many(
+                {"content_hash": content_hash, "status": "processing"},
                 {"$set": {"status": "completed"}},
             )
-            logger.info(f"Document {document_id} processed successfully")
+            await index_completed_documents(content_hash)
+            logger.info(f"Content {content_hash} processed successfully")
             return
 
         except Exception as e:
-            logger.error(f"Error processing document {document_id} (attempt {attempt + 1}): {e}")
+            logger.error(f"Error processing content {content_hash} (attempt {attempt + 1}): {e}")
             if attempt == MAX_RETRIES:
-                await documents_collection.update_one(
-                    {"_id": ObjectId(document_id)},
+                failed = await contents_collection.update_one(
+                    {"_id": content_hash},
+                    {"$set": {"status": "failed", "error": str(e)}},
+                )
+                if failed.matched_count == 0:
+                    # Released during processing; drop anything written before the failure
+                    await delete_content_artifacts(content_hash)
+                    return
+                await documents_collection.update_many(
+                    {"content_hash": content_hash, "status": "processing"},
                     {"$set": {"status": "failed", "error": str(e)}},
                 )
             else:
@@ -0,0 +1,163 @@
+"""
+Content-addressed cache for chat completion responses.
+
+Responses are keyed on (kind, model, temperature, max_tokens, system prompt
+hash, context hash), so re-running an analysis on an unchanged document reuses
+the earlier completions. Entries live in Redis with a TTL, and a sorted set of
+last-use times evicts the least recently used ones beyond llm_cache_max_entries.
+When Redis is unreachable, a bounded in-process LRU is used instead until
+Redis comes back.
+
+A run can skip cached responses (and refresh them) inside bypass_llm_cache().
+"""
+
+import time
+import json
+import hashlib
+import logging
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger("ifrs.llm_cache")
+
+KEY_PREFIX = "llm:"
+LRU_KEY = "llm:lru"
+REDIS_RETRY_SECONDS = 30
+
+_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+
+@contextmanager
+def bypass_llm_cache(force: bool = True):
+    """Skip cache reads for LLM calls made in this context; fresh responses are still stored."""
+    token = _bypass.set(force or _bypass.get())
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def _sha(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def prompt_label(system_prompt: str) -> str:
+    """Short human-readable name for a system prompt, used in hit-rate stats."""
+    first_line = system_prompt.strip().split("\n", 1)[0]
+    return first_line[:60]
+
+
+class LLMResponseCache:
+    """Redis-backed response cache with an in-process LRU fallback."""
+
+    def __init__(self, redis_url: str, ttl_seconds: int, max_entries: int, local_max_entries: int):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.local_max_entries = local_max_entries
+        self._redis = redis.from_url(redis_url, decode_responses=True)
+        self._redis_down_until = 0.0
+
+        # key -> (expires_at, response)
+        self._local: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._stats: dict[str, dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0, "bypassed": 0})
+
+    @staticmethod
+    def make_key(kind: str, model: str, temperature: float, system_prompt: str, context: str, **params) -> str:
+        parts = [kind, model, temperature, _sha(system_prompt), _sha(context), sorted(params.items())]
+        return KEY_PREFIX + _sha(json.dumps(parts, default=str))
+
+    def _redis_available(self) -> bool:
+        return time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, e: Exception):
+        if self._redis_available():
+            logger.warning(f"Redis unavailable for LLM cache, using local fallback: {e}")
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+    async def get(self, key: str, label: str) -> str | None:
+        stats = self._stats[label]
+        if _bypass.get():
+            stats["bypassed"] += 1
+            return None
+
+        value = None
+        if self._redis_available():
+            try:
+                value = await self._redis.get(key)
+                if value is not None:
+                    await self._redis.zadd(LRU_KEY, {key: time.time()})
+            except RedisError as e:
+                self._redis_failed(e)
+                value = self._local_get(key)
+        else:
+            value = self._local_get(key)
+
+        stats["hits" if value is not None else "misses"] += 1
+        return value
+
+    async def put(self, key: str, value: str):
+        if self._redis_available():
+            try:
+                async with self._redis.pipeline(transaction=False) as pipe:
+                    pipe.set(key, value, ex=self.ttl)
+                    pipe.zadd(LRU_KEY, {key: time.time()})
+                    pipe.zcard(LRU_KEY)
+                    *_, count = await pipe.execute()
+                if count > self.max_entries:
+                    evicted = await self._redis.zpopmin(LRU_KEY, count - self.max_entries)
+                    if evicted:
+                        await self._redis.delete(*(k for k, _ in evicted))
+                return
+            except RedisError as e:
+                self._redis_failed(e)
+        self._local_put(key, value)
+
+    def _local_get(self, key: str) -> str | None:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return entry[1]
+
+    def _local_put(self, key: str, value: str):
+        self._local[key] = (time.monotonic() + self.ttl, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_max_entries:
+            self._local.popitem(last=False)
+
+    def stats(self) -> dict:
+        prompts = {}
+        for label, counts in self._stats.items():
+            lookups = counts["hits"] + counts["misses"]
+            prompts[label] = {**counts, "hit_rate": round(counts["hits"] / lookups, 4) if lookups else 0.0}
+        return {
+            "backend": "redis" if self._redis_available() else "local",
+            "local_entries": len(self._local),
+            "ttl_seconds": self.ttl,
+            "max_entries": self.max_entries,
+            "prompts": prompts,
+        }
+
+
+# Singleton instance — initialized lazily from config
+_cache: LLMResponseCache | None = None
+
+
+def get_llm_cache() -> LLMResponseCache:
+    global _cache
+    if _cache is None:
+        from config import get_settings
+        settings = get_settings()
+        _cache = LLMResponseCache(
+            settings.redis_url,
+            settings.llm_cache_ttl_seconds,
+            settings.llm_cache_max_entries,
+            settings.llm_cache_local_max_entries,
+        )
+    return _cache
@@ -0,0 +1,193 @@
+"""
+MongoDB-backed vector store shared by every API replica and worker.
+
+Vectors and chunk texts are persisted in the ``embeddings`` collection, split
+into parts of vector_part_size chunks to stay under the 16 MB document limit:
+
+    {_id: document_id, kind: "head", allocated, version, parts, count, dimension}
+    {_id: "<document_id>:<version>:<part>", kind: "part", document_id, version,
+     part, vectors: <float32 bytes>, texts: [...]}
+
+A write allocates its version by incrementing the head's allocated counter,
+inserts the parts of that version and then flips the head, but only if no
+newer version was published meanwhile; a writer that loses the race removes
+its own parts. Readers always see a complete version, and the version before
+the current head is kept so a reader still loading it can finish.
+
+Each replica serves searches from a local FAISSVectorStore that it hydrates
+from MongoDB on first use and re-syncs when the head version changes; heads
+are re-checked at most every vector_sync_interval seconds per document.
+"""
+
+import time
+import logging
+import threading
+import numpy as np
+from bson import Binary
+from pymongo import MongoClient, ReplaceOne, ReturnDocument
+from services.chunk_store import MappedChunks
+from services.vector_store import ChunkHit, VectorStore, FAISSVectorStore, create_faiss_store
+
+logger = logging.getLogger("ifrs.mongo_vector_store")
+
+
+class MongoVectorStore(VectorStore):
+    """Vectors persisted in MongoDB with a lazily hydrated local FAISS cache."""
+
+    def __init__(self, collection, local: FAISSVectorStore, part_size: int = 512, sync_interval: float = 30.0):
+        self.collection = collection
+        self.local = local
+        self.part_size = part_size
+        self.sync_interval = sync_interval
+
+        # document_id -> (head version held locally, monotonic time of last head check)
+        self._synced: dict[str, tuple[int, float]] = {}
+        self._sync_lock = threading.Lock()
+        self.hydrations = 0
+
+    @classmethod
+    def from_settings(cls, settings) -> "MongoVectorStore":
+        from database import embeddings_collection
+
+        # Synchronous client: the store runs on worker threads, not the event loop
+        client = MongoClient(settings.mongodb_uri)
+        collection = client[settings.database_name][embeddings_collection.name]
+        return cls(
+            collection,
+            create_faiss_store(settings),
+            part_size=settings.vector_part_size,
+            sync_interval=settings.vector_sync_interval,
+        )
+
+    def _head(self, document_id: str) -> dict | None:
+        # A head that has only allocated a version has nothing published yet
+        return self.collection.find_one({"_id": document_id, "kind": "head", "version": {"$exists": True}})
+
+    def _fetch(self, document_id: str, head: dict) -> tuple[np.ndarray, list[str]] | None:
+        parts = list(self.collection.find(
+            {"kind": "part", "document_id": document_id, "version": head["version"]},
+        ).sort("part", 1))
+        if len(parts) != head["parts"]:
+            return None  # Superseded while reading
+        vectors = np.concatenate([
+            np.frombuffer(part["vectors"], dtype="float32").reshape(-1, head["dimension"]) for part in parts
+        ])
+        texts = [text for part in parts for text in part["texts"]]
+        return vectors, texts
+
+    def _sync(self, document_id: str) -> bool:
+        """Make sure the local cache holds the current version; False if the document has none."""
+        now = time.monotonic()
+        with self._sync_lock:
+            synced = self._synced.get(document_id)
+        if synced is not None and now - synced[1] < self.sync_interval and self.local.has_index(document_id):
+            return True
+
+        for _ in range(3):
+            head = self._head(document_id)
+            if head is None:
+                if self.local.has_index(document_id):
+                    self.local.delete_document(document_id)
+                with self._sync_lock:
+                    self._synced.pop(document_id, None)
+                return False
+
+            if synced is None or synced[0] != head["version"] or not self.local.has_index(document_id):
+                fetched = self._fetch(document_id, head)
+                if fetched is None:
+                    continue
+                self.local.add_vectors(document_id, *fetched)
+                self.hydrations += 1
+                logger.info(f"Hydrated document {document_id} v{head['version']} from MongoDB")
+
+            with self._sync_lock:
+                self._synced[document_id] = (head["version"], now)
+            return True
+        return False
+
+    def add_vectors(self, document_id: str, embeddings: list[list[float]] | np.ndarray, chunk_texts: list[str]):
+        if len(embeddings) == 0:
+            return
+
+        vectors = np.array(embeddings, dtype="float32")
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+        # Concurrent writers each get their own version, so their parts never overwrite each other
+        version = self.collection.find_one_and_update(
+            {"_id": document_id},
+            {"$inc": {"allocated": 1}, "$setOnInsert": {"kind": "head"}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )["allocated"]
+        parts = range(0, len(vectors), self.part_size)
+        self.collection.bulk_write([
+            ReplaceOne({"_id": f"{document_id}:{version}:{n}"}, {
+                "kind": "part",
+                "document_id": document_id,
+                "version": version,
+                "part": n,
+                "vectors": Binary(vectors[start:start + self.part_size].tobytes()),
+                "texts": chunk_texts[start:start + self.part_size],
+            }, upsert=True)
+            for n, start in enumerate(parts)
+        ], ordered=False)
+
+        previous = self.collection.find_one_and_update(
+            {"_id": document_id, "$or": [{"version": {"$exists": False}}, {"version": {"$lt": version}}]},
+            {"$set": {
+                "version": version,
+                "parts": len(parts),
+                "count": len(vectors),
+                "dimension": vectors.shape[1],
+            }},
+            projection={"version": 1},
+        )
+        if previous is None:
+            # A newer version was published, or the document deleted, while these parts were written
+            self.collection.delete_many({"kind": "part", "document_id": document_id, "version": version})
+            logger.info(f"Discarded superseded write v{version} of document {document_id}")
+            return
+        # Keep the version just replaced: a reader may still be loading its parts
+        self.collection.delete_many({
+            "kind": "part", "document_id": document_id, "version": {"$lt": previous.get("version", 0)},
+        })
+
+        self.local.add_vectors(document_id, vectors, chunk_texts)
+        with self._sync_lock:
+            self._synced[document_id] = (version, time.monotonic())
+
+    def search_batch(
+        self, document_id: str, query_vectors: list[list[float]], top_k: int | list[int] = 5
+    ) -> list[list[ChunkHit]]:
+        if not self._sync(document_id):
+            logger.warning(f"No vectors found in MongoDB for document {document_id}")
+            return [[] for _ in query_vectors]
+        return self.local.search_batch(document_id, query_vectors, top_k)
+
+    def get_vectors(self, document_id: str) -> np.ndarray | None:
+        if not self._sync(document_id):
+            return None
+        return self.local.get_vectors(document_id)
+
+    def get_chunk_texts(self, document_id: str) -> MappedChunks | list[str]:
+        if not self._sync(document_id):
+            return []
+        return self.local.get_chunk_texts(document_id)
+
+    def delete_document(self, document_id: str):
+        self.collection.delete_one({"_id": document_id, "kind": "head"})
+        self.collection.delete_many({"kind": "part", "document_id": document_id})
+        with self._sync_lock:
+            self._synced.pop(document_id, None)
+        self.local.delete_document(document_id)
+
+    def has_index(self, document_id: str) -> bool:
+        return self._head(document_id) is not None
+
+    def cache_stats(self) -> dict:
+        return {
+            **self.local.cache_stats(),
+            "backend": "mongo",
+            "hydrated_documents": len(self._synced),
+            "hydrations": self.hydrations,
+        }
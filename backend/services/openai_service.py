@@ -1,11 +1,19 @@
 import json
 import logging
 import asyncio
+from typing import AsyncIterator
 from datetime import datetime, timezone
-from openai import AsyncOpenAI, APITimeoutError, RateLimitError, APIConnectionError
+from openai import AsyncOpenAI, APITimeoutError, RateLimitError, APIConnectionError, BadRequestError
 from config import get_settings
 from database import documents_collection, reports_collection
-from services.vector_store import get_vector_store
+from services.vector_store import ChunkHit, get_async_vector_store
+from services.content_store import resolve_index_id
+from services.query_registry import get_query_registry
+from services.embedding_coalescer import EmbeddingCoalescer
+from services.llm_cache import get_llm_cache, prompt_label
+from services.rate_limiter import get_rate_limiter, estimate_tokens, retry_after_seconds
+from services.circuit_breaker import get_breaker
+from services.context_packer import pack_context
 
 logger = logging.getLogger("ifrs.openai")
 settings = get_settings()
@@ -13,30 +21,74 @@ client = AsyncOpenAI(api_key=settings.openai_api_key)
 
 MAX_RETRIES = 3
 
+# Completion tokens assumed per JSON analysis call when reserving TPM quota
+JSON_COMPLETION_ESTIMATE = 1000
+
+
+async def _backoff(error: Exception, model: str, attempt: int):
+    """Wait before retrying. 429s pause the model's rate-limit queue for Retry-After instead."""
+    if isinstance(error, RateLimitError):
+        get_rate_limiter().penalize(model, retry_after_seconds(error) or 2 ** attempt)
+        return
+    await asyncio.sleep(2 ** attempt)
+
 
 async def get_embedding(text: str) -> list[float]:
-    """Generate embedding for a text chunk."""
+    """Generate embedding for a text chunk.
+
+    Concurrent calls are coalesced into batched requests; see embedding_coalescer.
+    """
+    if settings.embedding_coalesce_window_ms <= 0:
+        return (await get_embeddings([text]))[0]
+    return await get_embedding_coalescer().embed(text)
+
+
+async def get_embeddings(texts: list[str]) -> list[list[float]]:
+    """Generate embeddings for a batch of text chunks in a single request."""
+    breaker = get_breaker("embeddings")
+    breaker.raise_if_open()
+    limiter = get_rate_limiter()
+    estimated = estimate_tokens(*texts)
     for attempt in range(MAX_RETRIES):
         try:
-            response = await client.embeddings.create(
-                model=settings.embedding_model,
-                input=text,
-            )
-            return response.data[0].embedding
+            async with limiter.slot(settings.embedding_model, estimated) as slot, breaker.guard():
+                response = await client.embeddings.create(
+                    model=settings.embedding_model,
+                    input=texts,
+                )
+                slot.settle(response.usage.total_tokens if response.usage else None)
+            # The API may return items out of order; re-sort by input index
+            return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
         except (APITimeoutError, APIConnectionError, RateLimitError) as e:
             if attempt == MAX_RETRIES - 1:
-                logger.error(f"Embedding failed after {MAX_RETRIES} retries: {e}")
+                logger.error(f"Batch embedding of {len(texts)} chunks failed after {MAX_RETRIES} retries: {e}")
                 raise
-            logger.warning(f"Embedding attempt {attempt + 1} failed, retrying: {e}")
-            await asyncio.sleep(2 ** attempt)
+            logger.warning(f"Batch embedding attempt {attempt + 1} failed, retrying: {e}")
+            await _backoff(e, settings.embedding_model, attempt)
+
+
+_coalescer: EmbeddingCoalescer | None = None
 
 
-async def retrieve_relevant_chunks(document_id: str, query: str, top_k: int = 5) -> list[str]:
+def get_embedding_coalescer() -> EmbeddingCoalescer:
+    global _coalescer
+    if _coalescer is None:
+        _coalescer = EmbeddingCoalescer(
+            get_embeddings,
+            settings.embedding_coalesce_window_ms,
+            settings.embedding_coalesce_max_batch,
+            isolate_errors=(BadRequestError,),
+        )
+    return _coalescer
+
+
+async def retrieve_relevant_chunks(document_id: str, query: str, top_k: int = 5) -> list[ChunkHit]:
     """RAG retrieval: find most relevant chunks for a query using FAISS."""
-    query_embedding = await get_embedding(query)
+    query_embedding = get_query_registry().get(query) or await get_embedding(query)
+    index_id = await resolve_index_id(document_id)
 
-    store = get_vector_store()
-    chunks = store.search(document_id, query_embedding, top_k)
+    store = get_async_vector_store()
+    chunks = await store.search(index_id, query_embedding, top_k)
 
     if not chunks:
         logger.warning(f"No FAISS results for document {document_id}")
@@ -44,28 +96,73 @@ async def retrieve_relevant_chunks(document_id: str, query: str, top_k: int = 5)
     return chunks
 
 
+async def retrieve_relevant_chunks_batch(
+    document_id: str, queries: list[str], top_k: int | list[int] = 5
+) -> list[list[ChunkHit]]:
+    """RAG retrieval for several queries against one document.
+
+    All queries are embedded in one request and searched as one query matrix,
+    so the index is loaded once. Built-in queries use precomputed embeddings.
+    Returns one chunk list per query, in order.
+    """
+    registry = get_query_registry()
+    query_embeddings = [registry.get(query) for query in queries]
+    missing = [i for i, embedding in enumerate(query_embeddings) if embedding is None]
+    if missing:
+        fresh = await get_embeddings([queries[i] for i in missing])
+        for i, embedding in zip(missing, fresh):
+            query_embeddings[i] = embedding
+    index_id = await resolve_index_id(document_id)
+
+    store = get_async_vector_store()
+    results = await store.search_batch(index_id, query_embeddings, top_k)
+
+    if not any(results):
+        logger.warning(f"No FAISS results for document {document_id}")
+
+    return results
+
+
 async def call_openai(system_prompt: str, user_content: str) -> str:
-    """Call OpenAI API with structured prompt and retry logic."""
+    """Call OpenAI API with structured prompt and retry logic.
+
+    Responses are cached by prompt and content; see llm_cache.
+    """
+    cache = get_llm_cache() if settings.llm_cache_enabled else None
+    if cache:
+        key = cache.make_key("json", settings.chat_model, 0.2, system_prompt, user_content)
+        cached = await cache.get(key, prompt_label(system_prompt))
+        if cached is not None:
+            return cached
+
+    breaker = get_breaker("chat")
+    breaker.raise_if_open()
+    limiter = get_rate_limiter()
+    estimated = estimate_tokens(system_prompt, user_content) + JSON_COMPLETION_ESTIMATE
     for attempt in range(MAX_RETRIES):
         try:
-            response = await client.chat.completions.create(
-                model=settings.chat_model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_content},
-                ],
-                temperature=0.2,
-                response_format={"type": "json_object"},
-            )
+            async with limiter.slot(settings.chat_model, estimated) as slot, breaker.guard():
+                response = await client.chat.completions.create(
+                    model=settings.chat_model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_content},
+                    ],
+                    temperature=0.2,
+                    response_format={"type": "json_object"},
+                )
+                slot.settle(response.usage.total_tokens if response.usage else None)
             content = response.choices[0].message.content
             json.loads(content)  # Validate JSON
+            if cache:
+                await cache.put(key, content)
             return content
         except (APITimeoutError, APIConnectionError, RateLimitError) as e:
             if attempt == MAX_RETRIES - 1:
                 logger.error(f"OpenAI call failed after {MAX_RETRIES} retries: {e}")
                 raise
             logger.warning(f"OpenAI attempt {attempt + 1} failed, retrying: {e}")
-            await asyncio.sleep(2 ** attempt)
+            await _backoff(e, settings.chat_model, attempt)
         except json.JSONDecodeError as e:
             logger.error(f"Invalid JSON response from OpenAI: {e}")
             if attempt == MAX_RETRIES - 1:
@@ -114,36 +211,86 @@ REPORT_PROMPTS = {
 }
 
 
-async def generate_report(document_id: str, report_type: str) -> dict:
-    """Generate an AI report for a document."""
-    prompt = REPORT_PROMPTS.get(report_type, REPORT_PROMPTS["board_summary"])
-    chunks = await retrieve_relevant_chunks(document_id, report_type, top_k=8)
+async def _complete_report(prompt: str, user_content: str) -> str:
+    breaker = get_breaker("chat")
+    breaker.raise_if_open()
+    limiter = get_rate_limiter()
+    estimated = estimate_tokens(prompt, user_content) + 2000
+    for attempt in range(MAX_RETRIES):
+        try:
+            async with limiter.slot(settings.chat_model, estimated) as slot, breaker.guard():
+                response = await client.chat.completions.create(
+                    model=settings.chat_model,
+                    messages=[
+                        {"role": "system", "content": prompt},
+                        {"role": "user", "content": user_content},
+                    ],
+                    temperature=0.3,
+                    max_tokens=2000,
+                )
+                slot.settle(response.usage.total_tokens if response.usage else None)
+            return response.choices[0].message.content
+        except (APITimeoutError, APIConnectionError, RateLimitError) as e:
+            if attempt == MAX_RETRIES - 1:
+                logger.error(f"Report generation failed after {MAX_RETRIES} retries: {e}")
+                raise
+            logger.warning(f"Report generation attempt {attempt + 1} failed: {e}")
+            await _backoff(e, settings.chat_model, attempt)
 
-    if not chunks:
-        raise ValueError("No document content available for report generation")
 
-    context = "\n\n".join(chunks)
+async def _open_report_stream(prompt: str, user_content: str, estimated: int):
+    """Start a streamed completion, retrying until the first response arrives.
 
+    The breaker and the rate limiter's concurrency slot cover only this part,
+    since total stream time is paced by the reader. Returns the stream and the
+    slot to settle once the stream's usage is known.
+    """
+    breaker = get_breaker("chat")
+    limiter = get_rate_limiter()
     for attempt in range(MAX_RETRIES):
         try:
-            response = await client.chat.completions.create(
-                model=settings.chat_model,
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": f"Based on the following report content:\n\n{context}"},
-                ],
-                temperature=0.3,
-                max_tokens=2000,
-            )
-            generated_text = response.choices[0].message.content
-            break
+            async with limiter.slot(settings.chat_model, estimated) as slot, breaker.guard():
+                stream = await client.chat.completions.create(
+                    model=settings.chat_model,
+                    messages=[
+                        {"role": "system", "content": prompt},
+                        {"role": "user", "content": user_content},
+                    ],
+                    temperature=0.3,
+                    max_tokens=2000,
+                    stream=True,
+                    # The final chunk then carries the usage (not yet a named parameter in this client)
+                    extra_body={"stream_options": {"include_usage": True}},
+                )
+            return stream, slot
         except (APITimeoutError, APIConnectionError, RateLimitError) as e:
             if attempt == MAX_RETRIES - 1:
-                logger.error(f"Report generation failed after {MAX_RETRIES} retries: {e}")
+                logger.error(f"Report stream failed after {MAX_RETRIES} retries: {e}")
                 raise
-            logger.warning(f"Report generation attempt {attempt + 1} failed: {e}")
-            await asyncio.sleep(2 ** attempt)
+            logger.warning(f"Report stream attempt {attempt + 1} failed: {e}")
+            await _backoff(e, settings.chat_model, attempt)
+
+
+def _stream_usage(chunk) -> int | None:
+    """Total tokens from a stream chunk's usage; only the final chunk has one."""
+    usage = getattr(chunk, "usage", None)
+    if isinstance(usage, dict):
+        return usage.get("total_tokens")
+    return usage.total_tokens if usage else None
+
+
+async def _report_input(document_id: str, report_type: str) -> tuple[str, str]:
+    prompt = REPORT_PROMPTS.get(report_type, REPORT_PROMPTS["board_summary"])
+    chunks = await retrieve_relevant_chunks(document_id, report_type, top_k=8)
+
+    if not chunks:
+        raise ValueError("No document content available for report generation")
+
+    context = pack_context(chunks, settings.report_context_token_budget)
+    return prompt, f"Based on the following report content:\n\n{context}"
 
+
+async def _save_report(document_id: str, report_type: str, generated_text: str) -> dict:
     report_doc = {
         "document_id": document_id,
         "report_type": report_type,
@@ -159,3 +306,62 @@ async def generate_report(document_id: str, report_type: str) -> dict:
         "generated_text": generated_text,
         "created_at": report_doc["created_at"],
     }
+
+
+async def generate_report(document_id: str, report_type: str) -> dict:
+    """Generate an AI report for a document."""
+    prompt, user_content = await _report_input(document_id, report_type)
+
+    cache = get_llm_cache() if settings.llm_cache_enabled else None
+    generated_text = None
+    if cache:
+        key = cache.make_key("text", settings.chat_model, 0.3, prompt, user_content, max_tokens=2000)
+        generated_text = await cache.get(key, f"report:{report_type}")
+
+    if generated_text is None:
+        generated_text = await _complete_report(prompt, user_content)
+        if cache:
+            await cache.put(key, generated_text)
+
+    return await _save_report(document_id, report_type, generated_text)
+
+
+async def stream_report(document_id: str, report_type: str) -> AsyncIterator[tuple[str, str | dict]]:
+    """Generate a report, yielding ("delta", text) as tokens arrive and then
+    ("done", report) once it has been persisted.
+
+    Closing the generator early (client disconnect) closes the upstream
+    response, which cancels generation; nothing is persisted in that case.
+    """
+    prompt, user_content = await _report_input(document_id, report_type)
+
+    cache = get_llm_cache() if settings.llm_cache_enabled else None
+    if cache:
+        key = cache.make_key("text", settings.chat_model, 0.3, prompt, user_content, max_tokens=2000)
+        cached = await cache.get(key, f"report:{report_type}")
+        if cached is not None:
+            yield "delta", cached
+            yield "done", await _save_report(document_id, report_type, cached)
+            return
+
+    get_breaker("chat").raise_if_open()
+    estimated = estimate_tokens(prompt, user_content) + 2000
+    parts = []
+    used = None
+    stream, slot = await _open_report_stream(prompt, user_content, estimated)
+    try:
+        async for chunk in stream:
+            used = _stream_usage(chunk) or used
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                yield "delta", delta
+    finally:
+        await stream.close()
+        # A stream closed early never reports usage; charge for what was generated
+        slot.settle(used if used is not None else estimate_tokens(prompt, user_content, "".join(parts)))
+    generated_text = "".join(parts)
+
+    if cache:
+        await cache.put(key, generated_text)
+    yield "done", await _save_report(document_id, report_type, generated_text)
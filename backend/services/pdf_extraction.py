@@ -0,0 +1,24 @@
+"""
+PDF text extraction helpers that run inside worker processes.
+
+Kept free of database / OpenAI imports so spawned workers start quickly.
+"""
+
+import time
+from PyPDF2 import PdfReader
+
+
+def count_pages(file_path: str) -> int:
+    """Return the number of pages in a PDF."""
+    return len(PdfReader(file_path).pages)
+
+
+def extract_page_range(file_path: str, start: int, end: int) -> list[tuple[str, float]]:
+    """Extract text from pages [start, end), returning (text, elapsed_ms) per page."""
+    reader = PdfReader(file_path)
+    results = []
+    for page_number in range(start, min(end, len(reader.pages))):
+        page_start = time.perf_counter()
+        page_text = reader.pages[page_number].extract_text() or ""
+        results.append((page_text, round((time.perf_counter() - page_start) * 1000, 2)))
+    return results
@@ -0,0 +1,127 @@
+"""
+Precomputed embeddings for the engines' fixed retrieval queries.
+
+The built-in analyses always retrieve with the same query strings (section
+queries, climate queries, report types). Their embeddings are computed once per
+embedding model and dimension, persisted to query_embeddings_path and loaded
+in the background at startup, so retrieval for built-in analyses makes no
+embeddings request once the load has finished.
+The file is keyed by model, dimension and QUERY_REGISTRY_VERSION; a mismatch,
+or a query string that changed, triggers recomputation of what is missing.
+"""
+
+import os
+import json
+import logging
+import threading
+
+logger = logging.getLogger("ifrs.query_registry")
+
+# Bump to force recomputation, e.g. after changing how queries are embedded
+QUERY_REGISTRY_VERSION = 1
+
+
+def static_queries() -> list[str]:
+    """Every fixed query string used by the engines and report generation."""
+    from engines.compliance_engine import S1_QUERY, S2_QUERY
+    from engines.risk_engine import CLIMATE_QUERY
+    from engines.document_analysis_engine import SECTIONS
+    from models.schemas import ReportType
+
+    queries = [S1_QUERY, S2_QUERY, CLIMATE_QUERY]
+    queries += [query for query, _, _ in SECTIONS.values()]
+    queries += [report_type.value for report_type in ReportType]
+    return list(dict.fromkeys(queries))
+
+
+class QueryEmbeddingRegistry:
+    """In-memory map of static query text -> embedding, backed by a JSON file."""
+
+    def __init__(self, path: str, model: str, dimension: int):
+        self.path = path
+        self.model = model
+        self.dimension = dimension
+        self._embeddings: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def key(self) -> dict:
+        return {"model": self.model, "dimension": self.dimension, "version": QUERY_REGISTRY_VERSION}
+
+    def _read(self) -> dict[str, list[float]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                stored = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable query embedding file {self.path}: {e}")
+            return {}
+        if stored.get("key") != self.key:
+            logger.info(f"Query embeddings in {self.path} are for {stored.get('key')}; recomputing")
+            return {}
+        return stored.get("embeddings", {})
+
+    def _write(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(f"{self.path}.tmp", "w") as f:
+            json.dump({"key": self.key, "embeddings": self._embeddings}, f)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    async def load(self, queries: list[str]):
+        """Load persisted embeddings and compute any that are missing in one batch."""
+        from services.openai_service import get_embeddings
+
+        stored = self._read()
+        embeddings = {query: stored[query] for query in queries if query in stored}
+        missing = [query for query in queries if query not in embeddings]
+        # Serve the persisted embeddings while the missing ones are computed
+        with self._lock:
+            self._embeddings = dict(embeddings)
+
+        if missing:
+            fresh = await get_embeddings(missing)
+            embeddings.update(zip(missing, fresh))
+            with self._lock:
+                self._embeddings = embeddings
+        if missing or len(stored) != len(embeddings):
+            self._write()
+        logger.info(f"Query registry loaded: {len(embeddings)} queries, {len(missing)} computed")
+
+    def get(self, query: str) -> list[float] | None:
+        with self._lock:
+            embedding = self._embeddings.get(query)
+            if embedding is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return embedding
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.key, "queries": len(self._embeddings), "hits": self.hits, "misses": self.misses}
+
+
+# Singleton instance — initialized lazily from config
+_registry: QueryEmbeddingRegistry | None = None
+
+
+def get_query_registry() -> QueryEmbeddingRegistry:
+    global _registry
+    if _registry is None:
+        from config import get_settings
+        settings = get_settings()
+        _registry = QueryEmbeddingRegistry(
+            settings.query_embeddings_path, settings.embedding_model, settings.embedding_dimension
+        )
+    return _registry
+
+
+async def load_query_registry():
+    """Startup task; retrieval falls back to the embeddings API until it finishes, or if it fails."""
+    try:
+        await get_query_registry().load(static_queries())
+    except Exception as e:
+        logger.warning(f"Could not load query embeddings, built-in queries will be embedded per call: {e}")
@@ -0,0 +1,263 @@
+"""
+Outbound rate limiting for OpenAI calls.
+
+Each model gets two token buckets, requests per minute and tokens per minute,
+refilled continuously up to one minute's quota. Callers wait in FIFO order
+per model until both buckets cover their request, then take one of
+openai_max_concurrency process-wide slots for the duration of the call. Token
+use is estimated up front and corrected from the response's usage. A 429 with
+Retry-After pauses the model's queue for that long.
+
+With rate_limit_shared the buckets live in Redis, so every API and worker
+process draws from one quota; queueing stays per process. While Redis is
+unreachable each process falls back to its local buckets.
+"""
+
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+import tiktoken
+from redis.exceptions import RedisError
+
+logger = logging.getLogger("ifrs.rate_limiter")
+
+# Refill the RPM and TPM hashes {tokens, ts} and take from both only if both
+# cover the request; returns seconds to wait (0 = taken)
+TAKE_SCRIPT = """
+local now = tonumber(ARGV[7])
+local levels = {}
+local wait = 0
+for i = 1, 2 do
+  local capacity = tonumber(ARGV[i * 3 - 2])
+  local rate = tonumber(ARGV[i * 3 - 1])
+  local amount = tonumber(ARGV[i * 3])
+  local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+  local tokens = tonumber(state[1]) or capacity
+  local ts = tonumber(state[2]) or now
+  tokens = math.min(capacity, tokens + (now - ts) * rate)
+  if tokens < amount then
+    wait = math.max(wait, (amount - tokens) / rate)
+  end
+  levels[i] = {tokens, amount}
+end
+for i = 1, 2 do
+  local tokens = levels[i][1]
+  if wait == 0 then
+    tokens = tokens - levels[i][2]
+  end
+  redis.call('HSET', KEYS[i], 'tokens', tokens, 'ts', now)
+  redis.call('EXPIRE', KEYS[i], 120)
+end
+return tostring(wait)
+"""
+
+
+class TokenBucket:
+    """Continuously refilled bucket holding at most one minute's quota."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        # A request larger than the bucket only waits for a full bucket
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+    def give(self, amount: float):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class _ModelLimits:
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.queue = asyncio.Lock()  # FIFO: waiters are woken in arrival order
+        self.waiting = 0
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.throttled = 0
+
+
+class Slot:
+    """Handle for an admitted call; report actual usage with settle()."""
+
+    def __init__(self, limiter: "RateLimiter", model: str, estimated: int):
+        self._limiter = limiter
+        self.model = model
+        self.estimated = estimated
+
+    def settle(self, actual_tokens: int | None):
+        if actual_tokens is not None:
+            self._limiter._settle(self.model, self.estimated - actual_tokens)
+
+
+class RateLimiter:
+    """Per-model RPM/TPM token buckets with FIFO queueing and a concurrency cap."""
+
+    def __init__(self, limits: dict[str, tuple[int, int]], max_concurrency: int = 16, redis_url: str | None = None):
+        self._limits = {model: _ModelLimits(rpm, tpm) for model, (rpm, tpm) in limits.items()}
+        self._default = limits.get("default", (500, 30000))
+        self._concurrency = asyncio.Semaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+
+        self._redis = None
+        self._take_script = None
+        self._redis_warned = 0.0
+        if redis_url:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(redis_url)
+            self._take_script = self._redis.register_script(TAKE_SCRIPT)
+
+    def _model(self, model: str) -> _ModelLimits:
+        if model not in self._limits:
+            self._limits[model] = _ModelLimits(*self._default)
+        return self._limits[model]
+
+    async def _shared_wait(self, model: str, limits: _ModelLimits, tokens: int) -> float | None:
+        """Take from the shared buckets; None if Redis is unavailable."""
+        args = []
+        for bucket, amount in ((limits.requests, 1), (limits.tokens, tokens)):
+            args += [bucket.capacity, bucket.rate, min(amount, bucket.capacity)]
+        try:
+            wait = await self._take_script(
+                keys=[f"ratelimit:{model}:rpm", f"ratelimit:{model}:tpm"], args=[*args, time.time()]
+            )
+        except RedisError as e:
+            now = time.monotonic()
+            if now - self._redis_warned > 60:
+                self._redis_warned = now
+                logger.warning(f"Shared rate limit unavailable, using local buckets: {e}")
+            return None
+        return float(wait)
+
+    async def _admit(self, model: str, limits: _ModelLimits, tokens: int):
+        while True:
+            pause = limits.blocked_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+
+            wait = await self._shared_wait(model, limits, tokens) if self._redis is not None else None
+            if wait is not None:
+                if wait <= 0:
+                    return
+            else:
+                wait = max(limits.requests.wait_time(1), limits.tokens.wait_time(tokens))
+                if wait <= 0:
+                    limits.requests.take(1)
+                    limits.tokens.take(tokens)
+                    return
+
+            limits.throttled += 1
+            await asyncio.sleep(wait)
+
+    @asynccontextmanager
+    async def slot(self, model: str, estimated_tokens: int):
+        """Wait for quota and a concurrency slot, then run the call inside the block."""
+        limits = self._model(model)
+        limits.waiting += 1
+        try:
+            async with limits.queue:
+                await self._admit(model, limits, estimated_tokens)
+            await self._concurrency.acquire()
+        finally:
+            limits.waiting -= 1
+
+        limits.in_flight += 1
+        try:
+            yield Slot(self, model, estimated_tokens)
+        finally:
+            limits.in_flight -= 1
+            self._concurrency.release()
+
+    def _settle(self, model: str, surplus: int):
+        # Local buckets only; shared buckets keep the estimate
+        if self._redis is None and surplus:
+            limits = self._model(model)
+            if surplus > 0:
+                limits.tokens.give(surplus)
+            else:
+                limits.tokens.take(-surplus)
+
+    def penalize(self, model: str, retry_after: float):
+        """Pause a model's queue after a 429."""
+        limits = self._model(model)
+        limits.blocked_until = max(limits.blocked_until, time.monotonic() + retry_after)
+        logger.warning(f"Rate limited on {model}; pausing for {retry_after:.1f}s")
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        models = {}
+        for model, limits in self._limits.items():
+            models[model] = {
+                "queue_depth": limits.waiting,
+                "in_flight": limits.in_flight,
+                "throttled": limits.throttled,
+                "rpm_available": round(max(0.0, limits.requests.tokens)),
+                "tpm_available": round(max(0.0, limits.tokens.tokens)),
+                "paused_seconds": round(max(0.0, limits.blocked_until - now), 1),
+            }
+        return {
+            "shared": self._redis is not None,
+            "max_concurrency": self.max_concurrency,
+            "models": models,
+        }
+
+
+_encoder = None
+
+
+def estimate_tokens(*texts: str) -> int:
+    global _encoder
+    if _encoder is None:
+        _encoder = tiktoken.get_encoding("cl100k_base")
+    return sum(len(_encoder.encode(text)) for text in texts)
+
+
+def retry_after_seconds(error: Exception) -> float | None:
+    """Parse Retry-After (or retry-after-ms) from an API error's response, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+# Singleton instance — initialized lazily from config
+_limiter: RateLimiter | None = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _limiter
+    if _limiter is None:
+        from config import get_settings
+        settings = get_settings()
+        _limiter = RateLimiter(
+            {
+                settings.chat_model: (settings.chat_rpm_limit, settings.chat_tpm_limit),
+                settings.embedding_model: (settings.embedding_rpm_limit, settings.embedding_tpm_limit),
+            },
+            settings.openai_max_concurrency,
+            settings.redis_url if settings.rate_limit_shared else None,
+        )
+    return _limiter
@@ -0,0 +1,68 @@
+"""
+Compressed storage for extracted document text.
+
+Text is kept out of the documents / document_contents records so metadata
+reads stay small, and is only loaded when explicitly requested. Entries are
+keyed by content hash (or by document ID for documents that predate content
+addressing). TextWriter compresses text as it is extracted, so ingestion never
+holds a document's full text in memory.
+"""
+
+import zlib
+import asyncio
+from datetime import datetime, timezone
+from bson import Binary
+from database import texts_collection
+
+COMPRESSION_LEVEL = 6
+
+
+class TextWriter:
+    """Incrementally compressed text, saved with save() once complete."""
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(COMPRESSION_LEVEL)
+        self._parts: list[bytes] = []
+        self.size = 0
+        self.chars = 0
+        self.blank = True
+
+    def write(self, text: str):
+        raw = text.encode("utf-8")
+        self.size += len(raw)
+        self.chars += len(text)
+        self.blank = self.blank and not text.strip()
+        self._parts.append(self._compressor.compress(raw))
+
+    async def save(self, key: str):
+        self._parts.append(self._compressor.flush())
+        data = b"".join(self._parts)
+        await texts_collection.replace_one(
+            {"_id": key},
+            {
+                "codec": "zlib",
+                "data": Binary(data),
+                "size": self.size,
+                "compressed_size": len(data),
+                "updated_at": datetime.now(timezone.utc),
+            },
+            upsert=True,
+        )
+
+
+async def save_text(key: str, text: str):
+    writer = TextWriter()
+    await asyncio.to_thread(writer.write, text)
+    await writer.save(key)
+
+
+async def load_text(key: str) -> str | None:
+    record = await texts_collection.find_one({"_id": key}, {"data": 1})
+    if not record:
+        return None
+    raw = await asyncio.to_thread(zlib.decompress, record["data"])
+    return raw.decode("utf-8")
+
+
+async def delete_text(key: str):
+    await texts_collection.delete_one({"_id": key})
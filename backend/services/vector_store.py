@@ -1,91 +1,700 @@
 import os
 import json
+import time
+import asyncio
 import logging
 import numpy as np
 import faiss
+import fcntl
 import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from services.chunk_store import MappedChunks, write_chunks
+from collections import OrderedDict
 
 logger = logging.getLogger("ifrs.vector_store")
 
 
-class FAISSVectorStore:
-    """Per-document FAISS indexes for vector similarity search."""
+@dataclass(frozen=True)
+class ChunkHit:
+    """A retrieved chunk's text and its position in the document."""
 
-    def __init__(self, index_dir: str, dimension: int = 1536):
+    text: str
+    position: int
+
+
+class MappedFlatIndex:
+    """Exact inner-product search over vectors memory-mapped from a ``.npy`` file.
+
+    faiss.read_index copies an IndexFlat into memory even with IO_FLAG_MMAP, so
+    Flat snapshots keep their raw vectors as ``.npy`` and are searched with
+    faiss.knn. The pages come from the OS page cache, shared by every process
+    searching the document. Implements the parts of faiss.Index used here.
+    """
+
+    def __init__(self, path: str):
+        self.vectors = np.load(path, mmap_mode="r")
+        self.ntotal, self.d = self.vectors.shape
+
+    def search(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        return faiss.knn(queries, self.vectors, k, metric=faiss.METRIC_INNER_PRODUCT)
+
+    def reconstruct_n(self, start: int, n: int) -> np.ndarray:
+        return np.array(self.vectors[start:start + n], dtype="float32")
+
+
+class VectorStore(ABC):
+    """Per-document chunk vectors and texts, searchable by inner product.
+
+    Vectors are normalized on write, so scores are cosine similarities.
+    Implementations must be safe to call from several threads.
+    """
+
+    @abstractmethod
+    def add_vectors(self, document_id: str, embeddings: list[list[float]] | np.ndarray, chunk_texts: list[str]):
+        """Store (replace) a document's chunk vectors and texts."""
+
+    def search(self, document_id: str, query_vector: list[float], top_k: int = 5) -> list[ChunkHit]:
+        """Search for the most similar chunks in a document's index."""
+        return self.search_batch(document_id, [query_vector], [top_k])[0]
+
+    @abstractmethod
+    def search_batch(
+        self, document_id: str, query_vectors: list[list[float]], top_k: int | list[int] = 5
+    ) -> list[list[ChunkHit]]:
+        """Search many queries against one document; top_k may be per query."""
+
+    @abstractmethod
+    def get_vectors(self, document_id: str) -> np.ndarray | None:
+        """Return a document's normalized vectors, or None if it has none."""
+
+    @abstractmethod
+    def get_chunk_texts(self, document_id: str) -> MappedChunks | list[str]:
+        """Return a document's chunk texts, indexed like its vectors."""
+
+    @abstractmethod
+    def delete_document(self, document_id: str):
+        """Remove a document's vectors and texts."""
+
+    @abstractmethod
+    def has_index(self, document_id: str) -> bool:
+        pass
+
+    @abstractmethod
+    def cache_stats(self) -> dict:
+        pass
+
+
+class FAISSVectorStore(VectorStore):
+    """Per-document FAISS indexes for vector similarity search.
+
+    Each write publishes an immutable snapshot: the index, chunk texts and
+    re-rank vectors are written as ``{id}.v{n}.*`` files, then the document's
+    ``{id}.meta.json`` manifest is swapped atomically to point at version n.
+    Readers only follow the manifest and never take a lock; writers to the same
+    document serialize on a per-document flock, which also covers other
+    processes sharing the directory. Superseded versions are deleted after
+    publishing, keeping vector_snapshot_retain previous versions.
+
+    Flat snapshots store raw vectors (``.vectors.npy``) searched through a
+    memory map; other index types are FAISS ``.index`` files read into memory.
+    """
+
+    def __init__(
+        self,
+        index_dir: str,
+        dimension: int = 1536,
+        cache_max_bytes: int = 256 * 1024 * 1024,
+        index_factory: str = "Flat",
+        min_train_points: int = 1000,
+        nprobe: int = 16,
+        search_dimension: int = 0,
+        rerank_factor: int = 4,
+        retain_versions: int = 1,
+        manifest_ttl: float = 1.0,
+    ):
         self.index_dir = index_dir
         self.dimension = dimension
-        self._lock = threading.Lock()
-        os.makedirs(index_dir, exist_ok=True)
-        logger.info(f"FAISS vector store initialized at {index_dir} (dim={dimension})")
+        self.retain_versions = retain_versions
+        # Cached snapshots are served for this long before the manifest is stat'ed again
+        self.manifest_ttl = manifest_ttl
+
+        # FAISS factory string for new indexes, e.g. "Flat", "SQfp16", "PQ64", "IVF64,PQ32"
+        self.index_factory = index_factory
+        self.min_train_points = min_train_points
+        self.nprobe = nprobe
+
+        # Two-tier (Matryoshka) mode: index the first search_dimension components
+        # and re-rank rerank_factor * top_k candidates against full vectors
+        self.search_dimension = search_dimension if 0 < search_dimension < dimension else 0
+        self.rerank_factor = max(1, rerank_factor)
+
+        # LRU of document_id -> (version, index, chunk texts, full vectors or None, approx bytes)
+        self.cache_max_bytes = cache_max_bytes
+        self._cache: OrderedDict[str, tuple] = OrderedDict()
+        # document_id -> [last manifest check, manifest stat signature] for cached entries
+        self._checked: dict[str, list] = {}
+        self._cache_bytes = 0
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+
+        os.makedirs(os.path.join(index_dir, "locks"), exist_ok=True)
+        logger.info(f"FAISS vector store initialized at {index_dir} (dim={dimension}, index={index_factory})")
+
+    def _lock_path(self, document_id: str) -> str:
+        return os.path.join(self.index_dir, "locks", document_id)
+
+    @contextmanager
+    def _write_lock(self, document_id: str):
+        path = self._lock_path(document_id)
+        while True:
+            lock_file = open(path, "w")
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # collect_garbage may have unlinked the file while we waited; lock the current one
+            try:
+                if os.fstat(lock_file.fileno()).st_ino == os.stat(path).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            lock_file.close()
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.index_dir, name)
+
+    def _meta_path(self, document_id: str) -> str:
+        return self._path(f"{document_id}.meta.json")
+
+    def _legacy_files(self, document_id: str) -> dict:
+        """Unversioned files written before snapshots; only read, never written."""
+        chunks_file = f"{document_id}.chunks.bin"
+        if not os.path.exists(self._path(chunks_file)):
+            # Stores written before the binary format; see scripts/convert_chunks.py
+            chunks_file = f"{document_id}.chunks.json"
+        full_file = f"{document_id}.full.npy"
+        return {
+            "version": 0,
+            "index_file": f"{document_id}.index",
+            "chunks_file": chunks_file,
+            "full_file": full_file if os.path.exists(self._path(full_file)) else None,
+        }
+
+    def _read_meta(self, document_id: str) -> dict | None:
+        """Return the published manifest, falling back to the legacy file layout."""
+        meta = None
+        try:
+            with open(self._meta_path(document_id), "r") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            pass
+        if meta is not None and meta.get("version"):
+            return meta
+
+        legacy = self._legacy_files(document_id)
+        if not os.path.exists(self._path(legacy["index_file"])):
+            return None
+        return {**(meta or {}), **legacy}
+
+    @staticmethod
+    def _fsync(path: str):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _truncate(vectors: np.ndarray, dimension: int) -> np.ndarray:
+        """Keep the leading components of Matryoshka embeddings and re-normalize."""
+        reduced = np.ascontiguousarray(vectors[:, :dimension], dtype="float32")
+        faiss.normalize_L2(reduced)
+        return reduced
+
+    def _build_index(self, vectors: np.ndarray, factory: str | None = None) -> tuple[faiss.Index, str]:
+        """Build and fill an index from normalized vectors.
+
+        Factories trained by k-means (IVF, PQ) fall back to Flat when a document
+        has fewer than min_train_points chunks or training fails.
+        """
+        factory = factory or self.index_factory
+        dimension = vectors.shape[1]
+        index = faiss.index_factory(dimension, factory, faiss.METRIC_INNER_PRODUCT)
+        if not index.is_trained:
+            clustered = "IVF" in factory or "PQ" in factory
+            try:
+                if clustered and len(vectors) < self.min_train_points:
+                    raise RuntimeError(f"{len(vectors)} vectors is too few to train {factory}")
+                index.train(vectors)
+            except RuntimeError as e:
+                logger.info(f"Falling back to Flat index: {e}")
+                factory = "Flat"
+                index = faiss.index_factory(dimension, factory, faiss.METRIC_INNER_PRODUCT)
+        index.add(vectors)
+        return index, factory
+
+    def _publish(
+        self,
+        document_id: str,
+        vectors: np.ndarray,
+        chunks_file: str | None = None,
+        chunk_texts: list[str] | None = None,
+        factory: str | None = None,
+    ) -> str:
+        """Write normalized full-dimension vectors as a new snapshot and publish it.
+
+        New chunk texts are written alongside; otherwise the snapshot shares the
+        current, immutable chunks file. In two-tier mode the index holds truncated
+        vectors and the full ones are kept as float16 for re-ranking. Must be
+        called under the document's write lock.
+        """
+        current = self._read_meta(document_id)
+        version = (current["version"] if current else 0) + 1
+        prefix = f"{document_id}.v{version}"
+
+        full_file = None
+        search_vectors = vectors
+        if self.search_dimension and vectors.shape[1] > self.search_dimension:
+            search_vectors = self._truncate(vectors, self.search_dimension)
+            full_file = f"{prefix}.full.npy"
+            with open(self._path(full_file), "wb") as f:
+                np.save(f, vectors.astype("float16"))
+            self._fsync(self._path(full_file))
+        index, factory = self._build_index(search_vectors, factory)
+
+        index_file = vectors_file = None
+        if factory == "Flat":
+            # Raw vectors, so readers can memory-map them (see MappedFlatIndex)
+            vectors_file = f"{prefix}.vectors.npy"
+            with open(self._path(vectors_file), "wb") as f:
+                np.save(f, np.ascontiguousarray(search_vectors, dtype="float32"))
+            self._fsync(self._path(vectors_file))
+        else:
+            index_file = f"{prefix}.index"
+            faiss.write_index(index, self._path(index_file))
+            self._fsync(self._path(index_file))
+
+        if chunk_texts is not None:
+            chunks_file = f"{prefix}.chunks.bin"
+            write_chunks(self._path(chunks_file), chunk_texts)
+            self._fsync(self._path(chunks_file))
+
+        meta = {
+            "version": version,
+            "index_file": index_file,
+            "vectors_file": vectors_file,
+            "chunks_file": chunks_file,
+            "full_file": full_file,
+            "index_type": factory,
+            "dimension": index.d,
+            "full_dimension": vectors.shape[1],
+            "rerank": full_file is not None,
+            "ntotal": index.ntotal,
+        }
+        meta_path = self._meta_path(document_id)
+        with open(f"{meta_path}.tmp", "w") as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+        self._collect_versions(document_id, meta)
+        self._invalidate(document_id)
+        return factory
+
+    def _document_files(self, document_id: str) -> list[str]:
+        # IDs are hex (content hashes or ObjectIds), so "{id}." never matches another document
+        return [
+            name for name in os.listdir(self.index_dir)
+            if name.startswith(f"{document_id}.") and name != f"{document_id}.meta.json"
+        ]
+
+    @staticmethod
+    def _file_version(document_id: str, name: str) -> int:
+        """Snapshot version of a file name; 0 for legacy unversioned files."""
+        part = name[len(document_id) + 1:].split(".", 1)[0]
+        return int(part[1:]) if part.startswith("v") and part[1:].isdigit() else 0
+
+    def _collect_versions(self, document_id: str, meta: dict):
+        """Delete files of snapshots older than the retained versions.
+
+        Readers that already opened an old snapshot keep their memory maps after
+        the unlink; readers that lose the race re-read the manifest.
+        """
+        live = {meta["index_file"], meta.get("vectors_file"), meta["chunks_file"], meta["full_file"]}
+        oldest_kept = meta["version"] - self.retain_versions
+        for name in self._document_files(document_id):
+            if name in live or self._file_version(document_id, name) >= oldest_kept:
+                continue
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
 
-    def _index_path(self, document_id: str) -> str:
-        return os.path.join(self.index_dir, f"{document_id}.index")
+    def collect_garbage(self) -> int:
+        """Sweep files left behind by superseded snapshots or crashed writers.
 
-    def _chunks_path(self, document_id: str) -> str:
-        return os.path.join(self.index_dir, f"{document_id}.chunks.json")
+        Returns the number of documents checked.
+        """
+        document_ids = self.list_documents()
+        for document_id in document_ids:
+            with self._write_lock(document_id):
+                meta = self._read_meta(document_id)
+                if meta is not None and meta["version"]:
+                    self._collect_versions(document_id, meta)
 
-    def add_vectors(self, document_id: str, embeddings: list[list[float]], chunk_texts: list[str]):
-        """Build a FAISS index for a document and persist to disk."""
-        if not embeddings:
+        # Lock files of deleted documents; removed under the lock, which writers re-check
+        for document_id in set(os.listdir(os.path.join(self.index_dir, "locks"))) - set(document_ids):
+            with self._write_lock(document_id):
+                if not os.path.exists(self._meta_path(document_id)) and not self._document_files(document_id):
+                    os.remove(self._lock_path(document_id))
+        return len(document_ids)
+
+    def list_documents(self) -> list[str]:
+        """IDs of all documents with a published or legacy index."""
+        ids = set()
+        for name in os.listdir(self.index_dir):
+            if name.endswith(".meta.json"):
+                ids.add(name[: -len(".meta.json")])
+            elif name.endswith(".index") and "." not in name[: -len(".index")]:
+                ids.add(name[: -len(".index")])
+        return sorted(ids)
+
+    def get_index_meta(self, document_id: str) -> dict:
+        """Return a document's index metadata; indexes written before it was recorded are Flat."""
+        meta = self._read_meta(document_id) or {}
+        return {"index_type": "Flat", "dimension": self.dimension, **meta}
+
+    def index_file_path(self, document_id: str) -> str | None:
+        """Path of the file holding the searchable vectors: .vectors.npy or .index."""
+        meta = self._read_meta(document_id)
+        return self._path(meta.get("vectors_file") or meta["index_file"]) if meta else None
+
+    def _apply_search_params(self, index: faiss.Index):
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf.nprobe = self.nprobe
+
+    def _cache_put(self, document_id: str, entry: tuple, signature: tuple | None):
+        size = entry[-1]
+        with self._cache_lock:
+            self._cache_pop(document_id)
+            if size > self.cache_max_bytes:
+                return
+            self._cache[document_id] = entry
+            self._checked[document_id] = [time.monotonic(), signature]
+            self._cache_bytes += size
+            while self._cache_bytes > self.cache_max_bytes:
+                evicted_id = next(iter(self._cache))
+                self._cache_pop(evicted_id)
+                self.cache_evictions += 1
+
+    def _cache_pop(self, document_id: str):
+        self._checked.pop(document_id, None)
+        entry = self._cache.pop(document_id, None)
+        if entry is not None:
+            self._cache_bytes -= entry[-1]
+
+    def _invalidate(self, document_id: str):
+        with self._cache_lock:
+            self._cache_pop(document_id)
+
+    def _open_snapshot(self, meta: dict) -> tuple:
+        if meta.get("vectors_file"):
+            index_path = self._path(meta["vectors_file"])
+            index = MappedFlatIndex(index_path)
+        else:
+            # Other index types, and Flat indexes written before .vectors.npy
+            index_path = self._path(meta["index_file"])
+            index = faiss.read_index(index_path)
+            self._apply_search_params(index)
+
+        chunks_path = self._path(meta["chunks_file"])
+        if chunks_path.endswith(".bin"):
+            texts = MappedChunks(chunks_path)
+        else:
+            with open(chunks_path, "r") as f:
+                texts = json.load(f)
+        size = os.path.getsize(index_path) + os.path.getsize(chunks_path)
+
+        full = None
+        if meta.get("full_file"):
+            full_path = self._path(meta["full_file"])
+            full = np.load(full_path, mmap_mode="r")
+            size += os.path.getsize(full_path)
+
+        return meta["version"], index, texts, full, size
+
+    def _meta_signature(self, document_id: str) -> tuple | None:
+        """Identity of the published manifest; it is replaced (new inode) on every publish."""
+        try:
+            st = os.stat(self._meta_path(document_id))
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _cached(self, document_id: str) -> tuple | None:
+        """The cached snapshot if the manifest is unchanged, checking it at most every manifest_ttl."""
+        with self._cache_lock:
+            entry = self._cache.get(document_id)
+            if entry is None:
+                return None
+            checked = self._checked[document_id]
+            if time.monotonic() - checked[0] < self.manifest_ttl:
+                self._cache.move_to_end(document_id)
+                self.cache_hits += 1
+                return entry
+
+        signature = self._meta_signature(document_id)
+        with self._cache_lock:
+            if self._cache.get(document_id) is not entry or checked[1] != signature:
+                return None
+            checked[0] = time.monotonic()
+            self._cache.move_to_end(document_id)
+            self.cache_hits += 1
+            return entry
+
+    def _load(
+        self, document_id: str
+    ) -> tuple[faiss.Index | MappedFlatIndex, MappedChunks | list[str], np.ndarray | None] | None:
+        """Return the current snapshot's index, chunk texts and re-rank vectors.
+
+        Snapshots published by other processes are picked up within
+        manifest_ttl: a cached snapshot is reused until then, after which the
+        manifest is stat'ed and only re-read if it was replaced.
+        """
+        entry = self._cached(document_id)
+        if entry is not None:
+            return entry[1], entry[2], entry[3]
+
+        for _ in range(3):
+            # Taken before reading, so a publish in between shows up as a change later
+            signature = self._meta_signature(document_id)
+            meta = self._read_meta(document_id)
+            if meta is None:
+                self._invalidate(document_id)
+                return None
+
+            with self._cache_lock:
+                self.cache_misses += 1
+            try:
+                entry = self._open_snapshot(meta)
+            except (FileNotFoundError, RuntimeError):
+                continue  # Superseded and collected by a concurrent writer; re-read the manifest
+
+            self._cache_put(document_id, entry, signature)
+            return entry[1], entry[2], entry[3]
+        return None
+
+    def cache_stats(self) -> dict:
+        with self._cache_lock:
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                "entries": len(self._cache),
+                "bytes": self._cache_bytes,
+                "max_bytes": self.cache_max_bytes,
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "evictions": self.cache_evictions,
+                "hit_rate": round(self.cache_hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def add_vectors(self, document_id: str, embeddings: list[list[float]] | np.ndarray, chunk_texts: list[str]):
+        """Build a FAISS index for a document and publish it as a new snapshot."""
+        if len(embeddings) == 0:
             return
 
-        with self._lock:
-            vectors = np.array(embeddings, dtype="float32")
-            faiss.normalize_L2(vectors)
+        vectors = np.array(embeddings, dtype="float32")
+        faiss.normalize_L2(vectors)
 
-            index = faiss.IndexFlatIP(self.dimension)
-            index.add(vectors)
+        with self._write_lock(document_id):
+            factory = self._publish(document_id, vectors, chunk_texts=chunk_texts)
 
-            faiss.write_index(index, self._index_path(document_id))
-            with open(self._chunks_path(document_id), "w") as f:
-                json.dump(chunk_texts, f)
+        logger.info(f"Stored {len(embeddings)} vectors for document {document_id} ({factory})")
 
-        logger.info(f"Stored {len(embeddings)} vectors for document {document_id}")
+    def rebuild_index(self, document_id: str, factory: str | None = None) -> str | None:
+        """Re-encode an existing index with another factory; chunk texts are untouched.
 
-    def search(self, document_id: str, query_vector: list[float], top_k: int = 5) -> list[str]:
-        """Search for the most similar chunks in a document's index."""
-        index_path = self._index_path(document_id)
-        chunks_path = self._chunks_path(document_id)
+        Vectors come from the re-rank side file when present, otherwise they are
+        reconstructed from the current index, so rebuilding from a lossy type
+        (PQ, SQ8) or a truncated index does not recover the original precision.
+        """
+        with self._write_lock(document_id):
+            loaded = self._load(document_id)
+            if loaded is None:
+                return None
+            vectors = self._vectors_of(loaded)
+            chunks_file = self._read_meta(document_id)["chunks_file"]
+            return self._publish(document_id, vectors, chunks_file=chunks_file, factory=factory)
 
-        if not os.path.exists(index_path) or not os.path.exists(chunks_path):
-            logger.warning(f"No FAISS index found for document {document_id}")
-            return []
+    def search_batch(
+        self, document_id: str, query_vectors: list[list[float]], top_k: int | list[int] = 5
+    ) -> list[list[ChunkHit]]:
+        """Search many queries against one document as a single FAISS call.
+
+        top_k may be one value for all queries or one per query.
+        """
+        top_ks = top_k if isinstance(top_k, list) else [top_k] * len(query_vectors)
+        queries = np.array(query_vectors, dtype="float32")
+        faiss.normalize_L2(queries)
 
-        index = faiss.read_index(index_path)
-        with open(chunks_path, "r") as f:
-            texts = json.load(f)
+        loaded = self._load(document_id)
+        if loaded is None:
+            logger.warning(f"No FAISS index found for document {document_id}")
+            return [[] for _ in query_vectors]
 
-        k = min(top_k, index.ntotal)
+        index, texts, full = loaded
+        k = min(max(top_ks, default=0), index.ntotal)
         if k == 0:
+            return [[] for _ in query_vectors]
+
+        if index.d < queries.shape[1]:
+            # Two-tier: short vectors generate candidates, full vectors re-rank them
+            candidates = min(k * self.rerank_factor, index.ntotal) if full is not None else k
+            _, indices = index.search(self._truncate(queries, index.d), candidates)
+            if full is not None:
+                indices = [self._rerank(full, query, row) for query, row in zip(queries, indices)]
+        else:
+            _, indices = index.search(queries, k)
+
+        return [
+            [ChunkHit(texts[i], int(i)) for i in row[:limit] if 0 <= i < len(texts)]
+            for row, limit in zip(indices, top_ks)
+        ]
+
+    @staticmethod
+    def _rerank(full: np.ndarray, query: np.ndarray, candidates: np.ndarray) -> list[int]:
+        ids = [int(i) for i in candidates if i >= 0]
+        if not ids:
             return []
+        scores = np.asarray(full[ids], dtype="float32") @ query
+        return [ids[i] for i in np.argsort(-scores)]
 
-        query = np.array([query_vector], dtype="float32")
-        faiss.normalize_L2(query)
+    def get_vectors(self, document_id: str) -> np.ndarray | None:
+        """Return a document's stored (normalized) vectors, or None if it has no index."""
+        loaded = self._load(document_id)
+        return self._vectors_of(loaded) if loaded is not None else None
 
-        _, indices = index.search(query, k)
-        return [texts[i] for i in indices[0] if 0 <= i < len(texts)]
+    @staticmethod
+    def _vectors_of(loaded: tuple) -> np.ndarray:
+        index, _, full = loaded
+        if full is not None:
+            return np.asarray(full, dtype="float32")
+        return index.reconstruct_n(0, index.ntotal)
+
+    def get_chunk_texts(self, document_id: str) -> MappedChunks | list[str]:
+        loaded = self._load(document_id)
+        return loaded[1] if loaded is not None else []
 
     def delete_document(self, document_id: str):
-        """Remove a document's FAISS index and chunk data from disk."""
-        for path in [self._index_path(document_id), self._chunks_path(document_id)]:
-            if os.path.exists(path):
-                os.remove(path)
+        """Unpublish a document's index, then remove all of its snapshot files."""
+        with self._write_lock(document_id):
+            meta_path = self._meta_path(document_id)
+            if os.path.exists(meta_path):
+                os.remove(meta_path)
+            for name in self._document_files(document_id):
+                os.remove(self._path(name))
+            self._invalidate(document_id)
         logger.info(f"Deleted FAISS index for document {document_id}")
 
     def has_index(self, document_id: str) -> bool:
-        return os.path.exists(self._index_path(document_id))
+        return self._cached(document_id) is not None or self._read_meta(document_id) is not None
+
+
+class AsyncVectorStore:
+    """Awaitable facade that runs FAISSVectorStore calls on a bounded thread pool.
+
+    FAISS releases the GIL during index builds and searches, so a few threads
+    keep the event loop free while ingestion and retrieval run side by side.
+    """
+
+    def __init__(self, store: VectorStore, max_workers: int = 4):
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="faiss")
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def add_vectors(self, document_id: str, embeddings: list[list[float]] | np.ndarray, chunk_texts: list[str]):
+        await self._run(self.store.add_vectors, document_id, embeddings, chunk_texts)
+
+    async def search(self, document_id: str, query_vector: list[float], top_k: int = 5) -> list[ChunkHit]:
+        return await self._run(self.store.search, document_id, query_vector, top_k)
+
+    async def search_batch(
+        self, document_id: str, query_vectors: list[list[float]], top_k: int | list[int] = 5
+    ) -> list[list[ChunkHit]]:
+        return await self._run(self.store.search_batch, document_id, query_vectors, top_k)
 
+    async def get_vectors(self, document_id: str) -> np.ndarray | None:
+        return await self._run(self.store.get_vectors, document_id)
 
-# Singleton instance — initialized lazily from config
-_store: FAISSVectorStore | None = None
+    async def get_chunk_texts(self, document_id: str) -> MappedChunks | list[str]:
+        return await self._run(self.store.get_chunk_texts, document_id)
 
+    async def delete_document(self, document_id: str):
+        await self._run(self.store.delete_document, document_id)
 
-def get_vector_store() -> FAISSVectorStore:
+    async def has_index(self, document_id: str) -> bool:
+        return await self._run(self.store.has_index, document_id)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+# Singleton instances — initialized lazily from config
+_store: VectorStore | None = None
+_async_store: AsyncVectorStore | None = None
+
+
+def create_faiss_store(settings, index_dir: str | None = None) -> FAISSVectorStore:
+    return FAISSVectorStore(
+        index_dir or settings.faiss_index_dir,
+        settings.embedding_dimension,
+        settings.vector_cache_max_mb * 1024 * 1024,
+        index_factory=settings.vector_index_factory,
+        min_train_points=settings.vector_index_min_train_points,
+        nprobe=settings.vector_index_nprobe,
+        search_dimension=settings.vector_search_dimension,
+        rerank_factor=settings.vector_rerank_factor,
+        retain_versions=settings.vector_snapshot_retain,
+        manifest_ttl=settings.vector_manifest_ttl_seconds,
+    )
+
+
+def get_vector_store() -> VectorStore:
+    """Return the configured backend: "faiss" (local volume) or "mongo" (shared)."""
     global _store
     if _store is None:
         from config import get_settings
         settings = get_settings()
-        faiss_dir = getattr(settings, "faiss_index_dir", "./faiss_data")
-        dimension = getattr(settings, "embedding_dimension", 1536)
-        _store = FAISSVectorStore(faiss_dir, dimension)
+        if settings.vector_backend == "mongo":
+            from services.mongo_vector_store import MongoVectorStore
+            _store = MongoVectorStore.from_settings(settings)
+        elif settings.vector_backend == "faiss":
+            _store = create_faiss_store(settings)
+        else:
+            raise ValueError(f"Unknown vector_backend: {settings.vector_backend}")
     return _store
+
+
+def get_async_vector_store() -> AsyncVectorStore:
+    global _async_store
+    if _async_store is None:
+        from config import get_settings
+        _async_store = AsyncVectorStore(get_vector_store(), get_settings().vector_store_threads)
+    return _async_store
+
+
+def shutdown_vector_store():
+    global _async_store
+    if _async_store is not None:
+        _async_store.shutdown()
+        _async_store = None
@@ -0,0 +1,24 @@
+from typing import Awaitable
+from fastapi import HTTPException, status
+from services.circuit_breaker import CircuitOpenError, get_breaker
+
+
+def results_stale() -> bool:
+    """Persisted AI results cannot be refreshed while the chat circuit is not closed."""
+    return not get_breaker("chat").is_closed
+
+
+async def serve_stale(read: Awaitable, error: CircuitOpenError):
+    """Return the last persisted result flagged stale, or 503 if there is none."""
+    try:
+        result = await read
+    except HTTPException as e:
+        if e.status_code != status.HTTP_404_NOT_FOUND:
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI service temporarily unavailable. Please try again shortly.",
+            headers={"Retry-After": str(int(error.retry_after) + 1)},
+        )
+    result.stale = True
+    return result
@@ -0,0 +1,111 @@
+"""
+Celery worker for document ingestion.
+
+Run with:
+    celery -A worker worker -Q ingest_small,ingest_large --loglevel=info
+
+Small uploads go to the ingest_small lane, which workers drain before
+ingest_large. Tasks are acknowledged only after they finish, so work held by a
+crashed worker is redelivered once the visibility timeout expires.
+
+Prefork pool children are daemonic, which multiprocessing refuses to let
+start processes of their own, so inside the worker PDF page ranges are parsed
+by a billiard pool of pdf_workers processes instead (see get_pdf_pool).
+Parallelism across documents comes from worker_concurrency.
+"""
+
+import asyncio
+import logging
+from celery import Celery
+from celery.signals import worker_process_shutdown
+from config import get_settings
+
+logger = logging.getLogger("ifrs.worker")
+settings = get_settings()
+
+SMALL_QUEUE = "ingest_small"
+LARGE_QUEUE = "ingest_large"
+
+# Held by the API process that re-enqueues stalled ingests at startup
+REQUEUE_LOCK_KEY = "ingest:requeue-lock"
+REQUEUE_LOCK_SECONDS = 300
+
+celery_app = Celery("ifrs", broker=settings.redis_url)
+celery_app.conf.update(
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    worker_concurrency=settings.worker_concurrency,
+    task_default_queue=LARGE_QUEUE,
+    task_ignore_result=True,
+    broker_transport_options={
+        "visibility_timeout": settings.ingest_visibility_timeout,
+        # Consume queues in the order given to -Q instead of round-robin
+        "queue_order_strategy": "priority",
+    },
+)
+
+# One event loop per worker process; the Motor client binds to it on first use
+_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _run(coro):
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop.run_until_complete(coro)
+
+
+@worker_process_shutdown.connect
+def _shutdown_pdf_pool(**kwargs):
+    from services.file_service import shutdown_pdf_pool
+    shutdown_pdf_pool()
+
+
+@celery_app.task(name="ingest.process_document")
+def process_document_task(content_hash: str, file_path: str):
+    from services.file_service import process_document
+    _run(process_document(content_hash, file_path))
+
+
+async def enqueue_ingest(content_hash: str, file_path: str, file_size: int | None = None):
+    """Queue ingestion of an upload's content on the lane matching its size."""
+    small = file_size is not None and file_size <= settings.ingest_small_file_mb * 1024 * 1024
+    queue = SMALL_QUEUE if small else LARGE_QUEUE
+    # apply_async talks to the broker synchronously; keep it off the event loop
+    await asyncio.to_thread(
+        process_document_task.apply_async, args=[content_hash, file_path], queue=queue
+    )
+    logger.info(f"Queued ingestion of content {content_hash} on {queue}")
+
+
+async def requeue_stalled_ingests():
+    """Re-enqueue content left in 'processing', e.g. after a restart.
+
+    process_document skips content that has already completed, so a record that
+    is still queued or in flight is at worst processed twice, never lost. Only
+    one API process per REQUEUE_LOCK_SECONDS does this, and a broker outage is
+    logged rather than failing startup.
+    """
+    import redis.asyncio as redis
+    from database import contents_collection
+
+    client = redis.from_url(settings.redis_url)
+    try:
+        if not await client.set(REQUEUE_LOCK_KEY, "1", nx=True, ex=REQUEUE_LOCK_SECONDS):
+            return  # Another process is requeueing, or did so moments ago
+
+        count = 0
+        async for content in contents_collection.find(
+            {"status": "processing"}, {"file_url": 1, "file_size": 1}
+        ):
+            await enqueue_ingest(content["_id"], content["file_url"], content.get("file_size"))
+            count += 1
+        if count:
+            logger.info(f"Re-enqueued {count} stalled ingests")
+    except Exception as e:
+        # Redis and Kombu broker errors alike; the next startup retries
+        logger.error(f"Could not re-enqueue stalled ingests: {e}")
+    finally:
+        await client.aclose()